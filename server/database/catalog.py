@@ -0,0 +1,74 @@
+import threading
+from database.models import Service, Action, Reaction
+
+# Snapshot of the static Service/Action/Reaction rows (seeded once, never edited at runtime).
+# Entries are plain dicts so they can be shared between threads and DB sessions.
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def _load_catalog() -> dict:
+    """Load every service, action and reaction in three queries"""
+    services = {}
+    for service in Service.query.all():
+        services[service.id] = {
+            'id': service.id,
+            'name': service.name,
+            'display_name': service.display_name,
+            'is_active': service.is_active
+        }
+
+    def snapshot(item):
+        service = services.get(item.service_id, {})
+        return {
+            'id': item.id,
+            'name': item.name,
+            'display_name': item.display_name,
+            'service_id': item.service_id,
+            'service_name': service.get('name'),
+            'service_display_name': service.get('display_name')
+        }
+
+    return {
+        'services': services,
+        'services_by_name': {service['name']: service for service in services.values()},
+        'actions': {action.id: snapshot(action) for action in Action.query.all()},
+        'reactions': {reaction.id: snapshot(reaction) for reaction in Reaction.query.all()}
+    }
+
+
+def _get_catalog() -> dict:
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = _load_catalog()
+    return _catalog
+
+
+def invalidate_catalog():
+    """Drop the cached catalog (call after seeding or editing services)"""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+
+def get_service_id(service_name):
+    """Return the ID of a service by internal name, or None"""
+    service = _get_catalog()['services_by_name'].get(service_name)
+    return service['id'] if service else None
+
+
+def get_action(action_id):
+    """Return the catalog entry of an action, or None"""
+    return _get_catalog()['actions'].get(action_id)
+
+
+def get_reaction(reaction_id):
+    """Return the catalog entry of a reaction, or None"""
+    return _get_catalog()['reactions'].get(reaction_id)
+
+
+def get_action_ids(action_names):
+    """Return the IDs of the actions with the given internal names"""
+    return [action['id'] for action in _get_catalog()['actions'].values() if action['name'] in action_names]
@@ -1,7 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime, timezone
+from database.routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class User(db.Model):
@@ -18,6 +19,9 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
 
+    # Filled by queries that ask for it with with_expression() (admin overview)
+    workflow_count = db.query_expression()
+
     # Ensure unique combination of oauth_provider and oauth_provider_id
     __table_args__ = (
         db.UniqueConstraint('oauth_provider', 'oauth_provider_id', name='unique_oauth_user'),
@@ -123,7 +127,7 @@ class UserArea(db.Model):
     __tablename__ = 'user_areas'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
     action_id = db.Column(db.Integer, db.ForeignKey('actions.id'), nullable=False)
@@ -132,9 +136,19 @@ class UserArea(db.Model):
     reaction_config = db.Column(db.JSON, nullable=False)  # e.g., {"to": "user@email.com", "subject": "...", "body": "..."}
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     last_triggered = db.Column(db.DateTime, nullable=True)  # Prevent duplicates
+    next_fire_at = db.Column(db.DateTime, nullable=True)  # Next trigger time (timers) or next poll (other actions), UTC
+    poll_interval_seconds = db.Column(db.Integer, nullable=True)  # Current adaptive poll interval, see scheduler/polling.py
+    last_event_at = db.Column(db.DateTime, nullable=True)  # Last time a poll found a new event
+    source_key = db.Column(db.String(255), nullable=True, index=True)  # Event source watched, e.g. "github:owner/repo" (routes webhooks)
+    push_enabled = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)  # Events are pushed by webhook, polling is only a fallback
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
 
+    # The scheduler only loads areas whose next_fire_at is due
+    __table_args__ = (
+        db.Index('ix_user_areas_active_next_fire_at', 'is_active', 'next_fire_at'),
+    )
+
     # Relationships
     user = db.relationship('User', backref='areas')
     action = db.relationship('Action')
@@ -143,24 +157,34 @@ class UserArea(db.Model):
     def __repr__(self):
         return f'<UserArea {self.name}>'
 
+    def _summary(self, entry, relationship):
+        """Action/reaction part of to_dict, from the catalog so listing areas loads no related rows"""
+        if entry is None:
+            # Not in the cached catalog (added after it was loaded): read the relationship
+            item = getattr(self, relationship)
+            return {
+                'id': item.id,
+                'name': item.name,
+                'display_name': item.display_name,
+                'service': item.service.display_name
+            }
+        return {
+            'id': entry['id'],
+            'name': entry['name'],
+            'display_name': entry['display_name'],
+            'service': entry['service_display_name']
+        }
+
     def to_dict(self):
+        from database.catalog import get_action, get_reaction
+
         return {
             'id': self.id,
             'user_id': self.user_id,
             'name': self.name,
             'description': self.description,
-            'action': {
-                'id': self.action_id,
-                'name': self.action.name,
-                'display_name': self.action.display_name,
-                'service': self.action.service.display_name
-            },
-            'reaction': {
-                'id': self.reaction_id,
-                'name': self.reaction.name,
-                'display_name': self.reaction.display_name,
-                'service': self.reaction.service.display_name
-            },
+            'action': self._summary(get_action(self.action_id), 'action'),
+            'reaction': self._summary(get_reaction(self.reaction_id), 'reaction'),
             'action_config': self.action_config,
             'reaction_config': self.reaction_config,
             'is_active': self.is_active,
@@ -178,9 +202,14 @@ class WorkflowLog(db.Model):
     area_id = db.Column(db.Integer, db.ForeignKey('user_areas.id', ondelete='CASCADE'), nullable=False)
     status = db.Column(db.String(20), nullable=False)  # 'success', 'failed', 'skipped'
     message = db.Column(db.Text, nullable=False)
-    triggered_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    triggered_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)  # Partition key on PostgreSQL, see database/partitioning.py
     execution_time_ms = db.Column(db.Integer, nullable=True)  # Performance tracking
 
+    # Log pages read an area's newest logs first
+    __table_args__ = (
+        db.Index('ix_workflow_logs_area_id_triggered_at', area_id, triggered_at.desc()),
+    )
+
     # Relationships
     area = db.relationship('UserArea', backref='logs')
 
@@ -199,6 +228,131 @@ class WorkflowLog(db.Model):
         }
 
 
+class WorkflowLogRollup(db.Model):
+    """Hourly and daily aggregates of workflow logs, kept longer than the raw rows"""
+    __tablename__ = 'workflow_log_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    area_id = db.Column(db.Integer, db.ForeignKey('user_areas.id', ondelete='CASCADE'), nullable=False)
+    granularity = db.Column(db.String(10), nullable=False)  # 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)  # UTC
+    count = db.Column(db.Integer, default=0, nullable=False)
+    success_count = db.Column(db.Integer, default=0, nullable=False)
+    failed_count = db.Column(db.Integer, default=0, nullable=False)
+    error_count = db.Column(db.Integer, default=0, nullable=False)
+    p50_execution_time_ms = db.Column(db.Integer, nullable=True)
+    p95_execution_time_ms = db.Column(db.Integer, nullable=True)
+
+    # One row per area and bucket, also serves the stats endpoint's range reads
+    __table_args__ = (
+        db.UniqueConstraint('area_id', 'granularity', 'bucket_start', name='unique_workflow_log_rollup'),
+        db.Index('ix_workflow_log_rollups_granularity_bucket_start', 'granularity', 'bucket_start'),
+    )
+
+    def __repr__(self):
+        return f'<WorkflowLogRollup area={self.area_id} {self.granularity} {self.bucket_start}>'
+
+    def to_dict(self):
+        return {
+            'bucket_start': self.bucket_start.isoformat(),
+            'count': self.count,
+            'success_count': self.success_count,
+            'failed_count': self.failed_count,
+            'error_count': self.error_count,
+            'success_ratio': round(self.success_count / self.count, 4) if self.count else None,
+            'p50_execution_time_ms': self.p50_execution_time_ms,
+            'p95_execution_time_ms': self.p95_execution_time_ms
+        }
+
+
+class ProcessedEvent(db.Model):
+    """Provider events already handled by a workflow (deduplication ledger)"""
+    __tablename__ = 'processed_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    area_id = db.Column(db.Integer, db.ForeignKey('user_areas.id', ondelete='CASCADE'), nullable=False)
+    provider = db.Column(db.String(50), nullable=False)  # 'gmail', 'drive', 'github', ...
+    external_event_id = db.Column(db.String(255), nullable=False)  # Provider's ID for the event (message ID, file ID, ...)
+    processed_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)  # Used for TTL pruning
+
+    # One entry per event per workflow, also serves lookups by (area_id, provider)
+    __table_args__ = (
+        db.UniqueConstraint('area_id', 'provider', 'external_event_id', name='unique_processed_event'),
+    )
+
+    def __repr__(self):
+        return f'<ProcessedEvent area={self.area_id} {self.provider}:{self.external_event_id}>'
+
+
+class ReactionJob(db.Model):
+    """Reactions waiting to run (durable queue drained by the scheduler's reaction workers)"""
+    __tablename__ = 'reaction_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    area_id = db.Column(db.Integer, db.ForeignKey('user_areas.id', ondelete='CASCADE'), nullable=False)
+    provider = db.Column(db.String(50), nullable=False)  # Reaction's service, for per-provider concurrency caps
+    trigger_message = db.Column(db.Text, nullable=True)  # What triggered the workflow, logged once the reaction ran
+    triggered_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # 'pending', 'running', 'dead'
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False)  # Next attempt, UTC
+    locked_by = db.Column(db.String(255), nullable=True)  # Scheduler node running the job
+    locked_until = db.Column(db.DateTime, nullable=True)  # Running jobs past this are retried (worker died)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    # Workers pick due jobs by status and run_at
+    __table_args__ = (
+        db.Index('ix_reaction_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    # Relationships
+    area = db.relationship('UserArea')
+
+    def __repr__(self):
+        return f'<ReactionJob {self.id} area={self.area_id} {self.status}>'
+
+
+class EmailDigestItem(db.Model):
+    """send_email notifications buffered for a recipient's next digest message"""
+    __tablename__ = 'email_digest_items'
+
+    id = db.Column(db.Integer, primary_key=True)
+    area_id = db.Column(db.Integer, db.ForeignKey('user_areas.id', ondelete='CASCADE'), nullable=False)
+    recipient = db.Column(db.String(255), nullable=False, index=True)  # Lowercased, items are grouped by it
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    flush_at = db.Column(db.DateTime, nullable=False, index=True)  # End of the item's digest window, UTC
+
+    def __repr__(self):
+        return f'<EmailDigestItem {self.id} to={self.recipient}>'
+
+
+class SchedulerNode(db.Model):
+    """Scheduler processes currently running (heartbeat)"""
+    __tablename__ = 'scheduler_nodes'
+
+    node_id = db.Column(db.String(255), primary_key=True)  # "hostname:pid:random"
+    heartbeat_at = db.Column(db.DateTime, nullable=False, index=True)
+    stats = db.Column(db.JSON, nullable=True)  # Latest tick/drain summaries of the node, read by /health
+
+    def __repr__(self):
+        return f'<SchedulerNode {self.node_id}>'
+
+
+class SchedulerShardLease(db.Model):
+    """Lease giving one scheduler node ownership of a shard of workflows"""
+    __tablename__ = 'scheduler_shard_leases'
+
+    shard_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # user_id % SCHEDULER_SHARD_COUNT
+    owner = db.Column(db.String(255), nullable=True)  # SchedulerNode.node_id, None when free
+    expires_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<SchedulerShardLease {self.shard_id} owner={self.owner}>'
+
+
 class UserServiceConnection(db.Model):
     __tablename__ = 'user_service_connections'
 
@@ -208,6 +362,10 @@ class UserServiceConnection(db.Model):
     access_token = db.Column(db.Text, nullable=False)
     refresh_token = db.Column(db.Text, nullable=True)
     token_expires_at = db.Column(db.DateTime, nullable=True)
+    sync_cursor = db.Column(db.String(255), nullable=True)  # Provider sync position (Gmail historyId, Drive changes page token)
+    sync_buffer = db.Column(db.JSON, nullable=True)  # Recent events read from the sync feed, shared by the user's areas
+    account_email = db.Column(db.String(255), nullable=True, index=True)  # Provider account address (routes Gmail push notifications)
+    watch_expires_at = db.Column(db.DateTime, nullable=True)  # Expiry of the Gmail users.watch subscription, UTC
     connected_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
 
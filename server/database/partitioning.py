@@ -0,0 +1,181 @@
+import re
+import zlib
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from database.models import db, WorkflowLog
+from database.util import utcnow, delete_in_batches
+from config import Config
+
+# workflow_logs is partitioned by month of triggered_at on PostgreSQL: expired
+# months are dropped whole instead of deleted row by row. Other databases
+# (SQLite in development) keep a plain table trimmed by batched deletes.
+TABLE = WorkflowLog.__tablename__
+DEFAULT_PARTITION = f'{TABLE}_default'  # Rows outside every monthly partition
+PARTITION_NAME = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+# Advisory lock taken by the node rotating partitions, so nodes never race on DDL
+ROTATION_LOCK_ID = zlib.crc32(b'workflow_logs_rotation')
+
+
+def _month_start(moment):
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(month):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _partition_name(month) -> str:
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def supports_partitioning(engine) -> bool:
+    return engine.dialect.name == 'postgresql'
+
+
+def is_partitioned(connection) -> bool:
+    return connection.execute(text(
+        'SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid '
+        'WHERE c.relname = :table AND pg_table_is_visible(c.oid)'
+    ), {'table': TABLE}).first() is not None
+
+
+def list_partitions(connection) -> list:
+    return [name for (name,) in connection.execute(text(
+        'SELECT c.relname FROM pg_inherits i '
+        'JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent '
+        'WHERE p.relname = :table ORDER BY c.relname'
+    ), {'table': TABLE})]
+
+
+def create_partitions(connection, now=None) -> list:
+    """Create the missing monthly partitions, from the retention cutoff to WORKFLOW_LOG_PARTITIONS_AHEAD months ahead
+
+    Each partition is built apart and then attached, after moving in the rows
+    the default partition received for its month, so attaching never fails
+    and only takes a light lock on the parent table.
+    """
+    now = now or utcnow()
+    month = _month_start(now - timedelta(days=Config.WORKFLOW_LOG_RETENTION_DAYS))
+    last = _month_start(now)
+    for _ in range(Config.WORKFLOW_LOG_PARTITIONS_AHEAD):
+        last = _next_month(last)
+
+    existing = set(list_partitions(connection))
+    created = []
+    while month <= last:
+        name = _partition_name(month)
+        if name not in existing:
+            bounds = {'start': month, 'end': _next_month(month)}
+            connection.execute(text(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)'))
+            connection.execute(text(
+                f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+                f'WHERE triggered_at >= :start AND triggered_at < :end RETURNING *) '
+                f'INSERT INTO {name} SELECT * FROM moved'
+            ), bounds)
+            connection.execute(text(
+                f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{bounds['start']:%Y-%m-%d}') TO ('{bounds['end']:%Y-%m-%d}')"
+            ))
+            created.append(name)
+        month = _next_month(month)
+    return created
+
+
+def drop_expired_partitions(connection, cutoff) -> list:
+    """Drop the monthly partitions whose whole month is older than the cutoff"""
+    dropped = []
+    for name in list_partitions(connection):
+        match = PARTITION_NAME.match(name)
+        if not match:
+            continue
+        month = datetime(int(match.group(1)), int(match.group(2)), 1)
+        if _next_month(month) <= cutoff:
+            connection.execute(text(f'DROP TABLE {name}'))
+            dropped.append(name)
+    return dropped
+
+
+def partition_workflow_logs(engine) -> bool:
+    """Convert workflow_logs to a table partitioned by month of triggered_at (PostgreSQL only)
+
+    Called by init_db. Existing rows are copied into the new layout in a
+    single transaction, which locks the table for the duration of the copy.
+    The primary key becomes (id, triggered_at) since PostgreSQL requires the
+    partition key in it; ids keep coming from the same sequence. Returns True
+    when the table was converted.
+    """
+    if not supports_partitioning(engine):
+        return False
+
+    legacy = f'{TABLE}_unpartitioned'
+    with engine.begin() as connection:
+        if is_partitioned(connection):
+            return False
+
+        connection.execute(text(f'ALTER TABLE {TABLE} RENAME TO {legacy}'))
+        connection.execute(text(f'ALTER TABLE {legacy} RENAME CONSTRAINT {TABLE}_pkey TO {legacy}_pkey'))
+        for index in WorkflowLog.__table__.indexes:
+            connection.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+
+        connection.execute(text(
+            f'CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS, '
+            f'PRIMARY KEY (id, triggered_at), '
+            f'FOREIGN KEY (area_id) REFERENCES user_areas (id) ON DELETE CASCADE) '
+            f'PARTITION BY RANGE (triggered_at)'
+        ))
+        sequence = connection.execute(text(f"SELECT pg_get_serial_sequence('{legacy}', 'id')")).scalar()
+        if sequence:
+            connection.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id'))
+
+        # Indexes created on the parent are created on every partition
+        for index in WorkflowLog.__table__.indexes:
+            index.create(bind=connection)
+        connection.execute(text(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT'))
+        create_partitions(connection)
+
+        connection.execute(text(f'INSERT INTO {TABLE} SELECT * FROM {legacy}'))
+        connection.execute(text(f'DROP TABLE {legacy}'))
+    return True
+
+
+def delete_expired_logs(cutoff, batch_size=None) -> int:
+    """Delete logs triggered before the cutoff, in bounded batches"""
+    try:
+        return delete_in_batches(
+            WorkflowLog, WorkflowLog.triggered_at < cutoff,
+            batch_size=batch_size or Config.WORKFLOW_LOG_DELETE_BATCH_SIZE
+        )
+    except Exception as e:
+        db.session.rollback()
+        print(f"Workflow log deletion error: {str(e)}")
+        return 0
+
+
+def rotate_workflow_logs(app, cutoff=None) -> int:
+    """Drop logs older than the cutoff (WORKFLOW_LOG_RETENTION_DAYS by default)
+
+    On a partitioned table, upcoming monthly partitions are created and
+    expired ones dropped by a single node at a time. The rows left before the
+    cutoff (in the partially expired month, the default partition, or the
+    whole table without partitioning) are then deleted in batches.
+    Returns the number of rows deleted one by one.
+    """
+    with app.app_context():
+        cutoff = cutoff or utcnow() - timedelta(days=Config.WORKFLOW_LOG_RETENTION_DAYS)
+
+        if supports_partitioning(db.engine):
+            try:
+                with db.engine.begin() as connection:
+                    locked = connection.execute(
+                        text('SELECT pg_try_advisory_xact_lock(:lock_id)'), {'lock_id': ROTATION_LOCK_ID}
+                    ).scalar()
+                    if locked and is_partitioned(connection):
+                        created = create_partitions(connection)
+                        dropped = drop_expired_partitions(connection, cutoff)
+                        if created or dropped:
+                            print(f"Workflow log partitions: created {created}, dropped {dropped}")
+            except Exception as e:
+                print(f"Workflow log partition rotation error: {str(e)}")
+
+        return delete_expired_logs(cutoff)
@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+
+# Bind key of the optional read replica (SQLALCHEMY_BINDS, set from DATABASE_REPLICA_URL)
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(Session):
+    """Session sending the SELECTs of read-only requests to the read replica
+
+    Only requests flagged by @read_replica are routed; everything else,
+    including the scheduler, flushes and UPDATE/DELETE statements, uses the
+    primary. Without a replica configured this behaves like the default session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and isinstance(clause, Select)
+            and has_app_context()
+            and g.get('use_read_replica')
+        ):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def replica_reads():
+    """Send the SELECTs run inside the block to the read replica (when configured)
+
+    Also usable inside the generator of a streamed response, which runs
+    after the view (and its @read_replica) has returned.
+    """
+    previous = g.get('use_read_replica', False)
+    g.use_read_replica = True
+    try:
+        yield
+    finally:
+        g.use_read_replica = previous
+
+
+def read_replica(f):
+    """Decorator serving a read-only route from the read replica (when configured)
+
+    Replicas lag behind the primary, so only use it on routes that can show
+    data a moment old and never write. Put it below @require_auth: the
+    signed-in user is looked up on the primary, a user who just registered
+    may not be on the replica yet.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with replica_reads():
+            return f(*args, **kwargs)
+
+    return decorated_function
@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from sqlalchemy import text
+from database.models import db
+
+
+def utcnow():
+    """Current UTC time without tzinfo, like every DateTime column compared in SQL"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def delete_in_batches(model, *criteria, batch_size) -> int:
+    """Delete the rows of model matching criteria, one committed transaction per batch_size rows
+
+    Keeps each DELETE short on large tables so it never holds locks (or
+    bloats the WAL) for long. Errors are raised to the caller after the
+    batches already deleted were committed. Returns the number of rows deleted.
+    """
+    deleted = 0
+    while True:
+        ids = [row_id for (row_id,) in db.session.query(model.id).filter(*criteria).limit(batch_size)]
+        if not ids:
+            break
+
+        # The criteria are repeated so PostgreSQL can prune partitions
+        model.query.filter(model.id.in_(ids), *criteria).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+
+    return deleted
+
+
+@contextmanager
+def try_advisory_lock(lock_id):
+    """Hold a PostgreSQL session advisory lock for the block, yielding whether it was acquired
+
+    The lock is held on a connection of its own, outside any transaction, so
+    the block can commit as often as it needs. Other databases (SQLite in
+    development) run a single node: the block always gets the lock.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        yield True
+        return
+
+    with db.engine.connect() as connection:
+        locked = connection.execute(text('SELECT pg_try_advisory_lock(:lock_id)'), {'lock_id': lock_id}).scalar()
+        connection.commit()
+        try:
+            yield locked
+        finally:
+            if locked:
+                connection.execute(text('SELECT pg_advisory_unlock(:lock_id)'), {'lock_id': lock_id})
+                connection.commit()
@@ -5,9 +5,10 @@ import os
 bind = "0.0.0.0:8080"
 
 # Worker configuration
-# Using 1 worker to avoid scheduler duplication issues
-# See GitHub issue for future improvement: move scheduler to separate container
-workers = int(os.getenv("GUNICORN_WORKERS", 1))
+# Workflows are checked by the standalone scheduler (run_scheduler.py), so the
+# web tier can run several workers. An embedded scheduler (SCHEDULER_ENABLED=true)
+# still only starts in one worker per host thanks to its file lock.
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
 worker_class = "sync"
 worker_connections = 1000
 
@@ -1,7 +1,34 @@
 #!/usr/bin/env python3
 from app import app, db
 from seed_data import seed_all
-from sqlalchemy import inspect
+from database.partitioning import partition_workflow_logs
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+
+
+def upgrade_existing_tables(inspector):
+    """Add columns and indexes declared on the models but missing from existing tables"""
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                if column.nullable or column.server_default is not None:
+                    # "name TYPE [DEFAULT ...] [NOT NULL]": existing rows get the server default
+                    column_spec = CreateColumn(column).compile(dialect=db.engine.dialect)
+                else:
+                    # NOT NULL without a default fails on existing rows: add it nullable, to be backfilled by hand
+                    column_spec = f'{column.name} {column.type.compile(dialect=db.engine.dialect)}'
+                    print(f"Warning: {table.name}.{column.name} has no server_default, added as nullable")
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column_spec}'))
+                print(f"Added column {table.name}.{column.name}")
+        db.session.commit()
+
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
 
 print("Initializing database...")
 
@@ -11,9 +38,15 @@ with app.app_context():
     existing_tables = inspector.get_table_names()
 
     if existing_tables:
-        print(f"Database already initialized with {len(existing_tables)} tables. Skipping initialization.")
+        # Create tables added since the database was initialized and upgrade the existing ones
+        db.create_all()
+        if partition_workflow_logs(db.engine):
+            print("Partitioned workflow_logs by month")
+        upgrade_existing_tables(inspector)
+        print(f"Database already initialized with {len(existing_tables)} tables. Skipping seeding.")
     else:
         db.create_all()
+        partition_workflow_logs(db.engine)
         print("Database tables created successfully")
         seed_all()
         print("Database seeding completed")
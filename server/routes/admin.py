@@ -1,33 +1,96 @@
-from flask import Blueprint, jsonify
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from sqlalchemy import func, or_
+from sqlalchemy.orm import selectinload, with_expression
 from database.models import db, User, UserArea
+from database.routing import read_replica, replica_reads
 from utils.auth_utils import require_auth
+from utils.pagination import paginate
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
+# Users loaded per round trip when streaming the overview
+STREAM_BATCH_SIZE = 500
+
+
+def _serialize_user(user, include_workflows):
+    result = {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'oauth_provider': user.oauth_provider,
+        'created_at': user.created_at.isoformat() if user.created_at else None,
+        'workflow_count': user.workflow_count,
+    }
+    if include_workflows:
+        result['workflows'] = [workflow.to_dict() for workflow in user.areas]
+    return result
+
+
+def _users_query(include_workflows):
+    """Users with their workflow count (and workflows), filtered by the request's ?search= and ?oauth_provider="""
+    workflow_count = db.session.query(func.count(UserArea.id)).filter(
+        UserArea.user_id == User.id
+    ).correlate(User).scalar_subquery()
+    # populate_existing: the admin's own row is already in the session without a count
+    query = User.query.options(with_expression(User.workflow_count, workflow_count)).execution_options(populate_existing=True)
+
+    # Workflows of a page (or stream batch) are loaded in one extra query
+    if include_workflows:
+        query = query.options(selectinload(User.areas))
+
+    search = request.args.get('search')
+    if search:
+        pattern = f'%{search}%'
+        query = query.filter(or_(User.username.ilike(pattern), User.email.ilike(pattern)))
+
+    oauth_provider = request.args.get('oauth_provider')
+    if oauth_provider == 'local':
+        query = query.filter(User.oauth_provider.is_(None))
+    elif oauth_provider:
+        query = query.filter(User.oauth_provider == oauth_provider)
+
+    return query
+
+
+def _wants_ndjson() -> bool:
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
 
 @admin_bp.route('/users', methods=['GET'])
 @require_auth
+@read_replica
 def get_all_users(current_user):
-    """Get all users with their workflows for admin"""
+    """Get all users with their workflows for admin
+
+    Without pagination parameters every user is returned, as before. With
+    ?page=, ?per_page= or ?cursor= the list is paginated (see utils/pagination.py),
+    and ?format=ndjson streams one user per line in constant memory.
+    """
     if current_user.id != 1:
         return jsonify({'error': 'Admin access required'}), 403
 
-    users = User.query.all()
-    result = []
-
-    for user in users:
-        # Get user's workflows with full details
-        workflows = UserArea.query.filter_by(user_id=user.id).all()
-        workflow_list = [workflow.to_dict() for workflow in workflows]
-
-        result.append({
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'oauth_provider': user.oauth_provider,
-            'created_at': user.created_at.isoformat() if user.created_at else None,
-            'workflow_count': len(workflows),
-            'workflows': workflow_list,
-        })
-
-    return jsonify({'users': result}), 200
+    include_workflows = request.args.get('include_workflows', 'true').lower() == 'true'
+    query = _users_query(include_workflows)
+
+    if _wants_ndjson():
+        def generate():
+            with replica_reads():
+                for user in query.order_by(User.id).yield_per(STREAM_BATCH_SIZE):
+                    yield json.dumps(_serialize_user(user, include_workflows)) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    if not any(param in request.args for param in ('page', 'per_page', 'cursor')):
+        users = query.order_by(User.id).all()
+        return jsonify({'users': [_serialize_user(user, include_workflows) for user in users]}), 200
+
+    try:
+        page = paginate(query, [User.created_at, User.id], default_per_page=50)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    page['users'] = [_serialize_user(user, include_workflows) for user in page.pop('items')]
+    return jsonify(page), 200
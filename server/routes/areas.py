@@ -1,11 +1,22 @@
 from flask import Blueprint, request, jsonify
-from database.models import db, UserArea, WorkflowLog, Action, Reaction
+from sqlalchemy.orm import joinedload
+from database.models import db, UserArea, WorkflowLog, WorkflowLogRollup, Action, Reaction
+from database.routing import read_replica
 from utils.auth_utils import require_auth
-from datetime import datetime, timezone
+from utils.pagination import paginate
+from scheduler.timers import schedule_area
+from scheduler.sources import update_source
+from datetime import datetime, timezone, timedelta
+from config import Config
 
 areas_bp = Blueprint('areas', __name__, url_prefix='/api/areas')
 
 
+def _get_area_with_action(area_id):
+    """Load an area and its action in one query (schedule_area/update_source need the action's name)"""
+    return UserArea.query.options(joinedload(UserArea.action)).filter_by(id=area_id).first()
+
+
 @areas_bp.route('', methods=['POST'])
 @require_auth
 def create_area(current_user):
@@ -38,6 +49,8 @@ def create_area(current_user):
         reaction_config=data['reaction_config'],
         is_active=data.get('is_active', True)
     )
+    schedule_area(new_area, action.name)
+    update_source(new_area, action.name)
 
     db.session.add(new_area)
     db.session.commit()
@@ -50,11 +63,9 @@ def create_area(current_user):
 
 @areas_bp.route('', methods=['GET'])
 @require_auth
+@read_replica
 def list_areas(current_user):
     """List all workflows for the current user"""
-    # Get query parameters for pagination
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     is_active = request.args.get('is_active', type=str)
 
     # Build query
@@ -65,19 +76,14 @@ def list_areas(current_user):
         is_active_bool = is_active.lower() == 'true'
         query = query.filter_by(is_active=is_active_bool)
 
-    # Order by creation date (newest first)
-    query = query.order_by(UserArea.created_at.desc())
-
-    # Paginate
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Paginate, newest first
+    try:
+        page = paginate(query, [UserArea.created_at, UserArea.id], default_per_page=20)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    return jsonify({
-        'areas': [area.to_dict() for area in pagination.items],
-        'total': pagination.total,
-        'page': pagination.page,
-        'per_page': pagination.per_page,
-        'total_pages': pagination.pages
-    }), 200
+    page['areas'] = [area.to_dict() for area in page.pop('items')]
+    return jsonify(page), 200
 
 
 @areas_bp.route('/<int:area_id>', methods=['GET'])
@@ -100,7 +106,7 @@ def get_area(current_user, area_id):
 @require_auth
 def update_area(current_user, area_id):
     """Update a workflow"""
-    area = UserArea.query.get(area_id)
+    area = _get_area_with_action(area_id)
 
     if not area:
         return jsonify({'error': 'Workflow not found'}), 404
@@ -120,6 +126,9 @@ def update_area(current_user, area_id):
         area.reaction_config = data['reaction_config']
     if 'is_active' in data:
         area.is_active = data['is_active']
+    if 'action_config' in data or 'is_active' in data:
+        schedule_area(area, area.action.name)
+        update_source(area, area.action.name)
 
     area.updated_at = datetime.now(timezone.utc)
     db.session.commit()
@@ -134,7 +143,7 @@ def update_area(current_user, area_id):
 @require_auth
 def patch_area(current_user, area_id):
     """Partial update a workflow (e.g., toggle active status)"""
-    area = UserArea.query.get(area_id)
+    area = _get_area_with_action(area_id)
 
     if not area:
         return jsonify({'error': 'Workflow not found'}), 404
@@ -155,6 +164,9 @@ def patch_area(current_user, area_id):
         area.action_config = data['action_config']
     if 'reaction_config' in data:
         area.reaction_config = data['reaction_config']
+    if 'action_config' in data or 'is_active' in data:
+        schedule_area(area, area.action.name)
+        update_source(area, area.action.name)
 
     area.updated_at = datetime.now(timezone.utc)
     db.session.commit()
@@ -169,7 +181,7 @@ def patch_area(current_user, area_id):
 @require_auth
 def toggle_area(current_user, area_id):
     """Toggle workflow active status"""
-    area = UserArea.query.get(area_id)
+    area = _get_area_with_action(area_id)
 
     if not area:
         return jsonify({'error': 'Workflow not found'}), 404
@@ -181,6 +193,7 @@ def toggle_area(current_user, area_id):
 
     # Toggle active status
     area.is_active = not area.is_active
+    schedule_area(area, area.action.name)
     area.updated_at = datetime.now(timezone.utc)
     db.session.commit()
 
@@ -238,6 +251,7 @@ def reset_all_areas(current_user):
 
 @areas_bp.route('/<int:area_id>/logs', methods=['GET'])
 @require_auth
+@read_replica
 def get_area_logs(current_user, area_id):
     """Get execution logs for a specific workflow"""
     area = UserArea.query.get(area_id)
@@ -249,19 +263,65 @@ def get_area_logs(current_user, area_id):
     if area.user_id != current_user.id:
         return jsonify({'error': 'Unauthorized access to this workflow'}), 403
 
-    # Get pagination parameters
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 50, type=int)
-
     # Query logs for this area (newest first)
-    pagination = WorkflowLog.query.filter_by(area_id=area_id)\
-        .order_by(WorkflowLog.triggered_at.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    try:
+        page = paginate(
+            WorkflowLog.query.filter_by(area_id=area_id),
+            [WorkflowLog.triggered_at, WorkflowLog.id],
+            default_per_page=50
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    page['logs'] = [log.to_dict() for log in page.pop('items')]
+    return jsonify(page), 200
+
+
+@areas_bp.route('/<int:area_id>/stats', methods=['GET'])
+@require_auth
+@read_replica
+def get_area_stats(current_user, area_id):
+    """Get hourly or daily execution statistics for a specific workflow"""
+    area = UserArea.query.get(area_id)
+
+    if not area:
+        return jsonify({'error': 'Workflow not found'}), 404
+
+    # Verify ownership
+    if area.user_id != current_user.id:
+        return jsonify({'error': 'Unauthorized access to this workflow'}), 403
+
+    granularity = request.args.get('granularity', 'day')
+    retention_days = {
+        'hour': Config.WORKFLOW_LOG_HOURLY_ROLLUP_DAYS,
+        'day': Config.WORKFLOW_LOG_DAILY_ROLLUP_DAYS
+    }
+    if granularity not in retention_days:
+        return jsonify({'error': 'granularity must be "hour" or "day"'}), 400
+
+    days = request.args.get('days', 30, type=int)
+    days = max(1, min(days, retention_days[granularity]))
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+
+    # Rollups cover closed buckets only, the current hour/day is not included yet
+    rollups = WorkflowLogRollup.query.filter(
+        WorkflowLogRollup.area_id == area_id,
+        WorkflowLogRollup.granularity == granularity,
+        WorkflowLogRollup.bucket_start >= since
+    ).order_by(WorkflowLogRollup.bucket_start).all()
+
+    totals = {
+        'count': sum(rollup.count for rollup in rollups),
+        'success_count': sum(rollup.success_count for rollup in rollups),
+        'failed_count': sum(rollup.failed_count for rollup in rollups),
+        'error_count': sum(rollup.error_count for rollup in rollups)
+    }
+    totals['success_ratio'] = round(totals['success_count'] / totals['count'], 4) if totals['count'] else None
 
     return jsonify({
-        'logs': [log.to_dict() for log in pagination.items],
-        'total': pagination.total,
-        'page': pagination.page,
-        'per_page': pagination.per_page,
-        'total_pages': pagination.pages
+        'area_id': area_id,
+        'granularity': granularity,
+        'days': days,
+        'buckets': [rollup.to_dict() for rollup in rollups],
+        'totals': totals
     }), 200
@@ -1,7 +1,11 @@
 from flask import Blueprint, request, jsonify
 from utils.about import get_about_json
-from database.models import db, Service
+from database.models import db, Service, SchedulerNode
+from database.routing import REPLICA_BIND, read_replica
 from config import Config
+from scheduler import queue_depth
+from scheduler.sharding import live_nodes
+from utils.rate_limits import budget_summary
 
 main_bp = Blueprint('main', __name__)
 
@@ -13,6 +17,7 @@ def index():
 
 
 @main_bp.route('/about.json')
+@read_replica
 def about():
     """Returns information about available services, actions, and reactions."""
     return get_about_json(request)
@@ -36,10 +41,34 @@ def health():
         health_status['status'] = 'unhealthy'
         health_status['database'] = f'error: {str(e)}'
 
+    # Check read replica connectivity (when configured)
+    if REPLICA_BIND in db.engines:
+        try:
+            with db.engines[REPLICA_BIND].connect() as connection:
+                connection.execute(db.text('SELECT 1'))
+            health_status['database_replica'] = 'connected'
+        except Exception as e:
+            health_status['database_replica'] = f'error: {str(e)}'
+
     # Check scheduler status
     try:
         health_status['scheduler'] = 'enabled' if Config.SCHEDULER_ENABLED else 'disabled'
         health_status['services']['scheduler_interval'] = f"{Config.SCHEDULER_CHECK_INTERVAL_MINUTES} minutes"
+        health_status['services']['scheduler_workers'] = Config.SCHEDULER_MAX_WORKERS
+        health_status['services']['reaction_workers'] = Config.REACTION_WORKERS
+        health_status['services']['reaction_queue'] = queue_depth()
+        # Published by each scheduler node on its heartbeat row, whichever process runs it
+        nodes = live_nodes().order_by(SchedulerNode.node_id).all()
+        health_status['services']['scheduler_nodes'] = {
+            node.node_id: {
+                'heartbeat_at': node.heartbeat_at.isoformat(),
+                **{section: stats for section, stats in (node.stats or {}).items() if section != 'rate_limits'}
+            }
+            for node in nodes
+        }
+        health_status['services']['github_rate_limit'] = budget_summary(
+            (node.stats or {}).get('rate_limits', {}).get('github', []) for node in nodes
+        )
     except Exception as e:
         health_status['scheduler'] = f'error: {str(e)}'
 
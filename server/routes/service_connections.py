@@ -124,6 +124,9 @@ def gmail_callback():
             gmail_connection.access_token = token['access_token']
             gmail_connection.refresh_token = token.get('refresh_token', gmail_connection.refresh_token)
             gmail_connection.token_expires_at = expires_at
+            gmail_connection.sync_cursor = None  # May be another Google account, resync from scratch
+            gmail_connection.sync_buffer = None
+            gmail_connection.watch_expires_at = None
             gmail_connection.updated_at = datetime.now(timezone.utc)
         else:
             # Create new connection
@@ -136,6 +139,10 @@ def gmail_callback():
             )
             db.session.add(gmail_connection)
 
+        # Address Gmail push notifications are sent for
+        account_email = (token.get('userinfo') or {}).get('email')
+        gmail_connection.account_email = account_email.lower() if account_email else None
+
         # Create/update connection for Drive (same token)
         if drive_service:
             drive_connection = UserServiceConnection.query.filter_by(
@@ -148,6 +155,8 @@ def gmail_callback():
                 drive_connection.access_token = token['access_token']
                 drive_connection.refresh_token = token.get('refresh_token', drive_connection.refresh_token)
                 drive_connection.token_expires_at = expires_at
+                drive_connection.sync_cursor = None  # May be another Google account, resync from scratch
+                drive_connection.sync_buffer = None
                 drive_connection.updated_at = datetime.now(timezone.utc)
             else:
                 # Create new connection
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify
 from database.models import Service
+from database.routing import read_replica
 from utils.auth_utils import require_auth
 
 services_bp = Blueprint('services', __name__, url_prefix='/api/services')
@@ -7,6 +8,7 @@ services_bp = Blueprint('services', __name__, url_prefix='/api/services')
 
 @services_bp.route('', methods=['GET'])
 @require_auth
+@read_replica
 def list_services(current_user):
     """List all available services with their actions and reactions"""
     services = Service.query.filter_by(is_active=True).all()
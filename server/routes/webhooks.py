@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime, timezone
+from flask import Blueprint, request, jsonify
+from database.models import db, UserArea, Action, UserServiceConnection
+from database.catalog import get_service_id, get_action_ids
+from config import Config
+from scheduler.core import process_pushed_event
+from scheduler.sources import github_source_key, GMAIL_PUSH_ACTIONS
+
+webhooks_bp = Blueprint('webhooks', __name__, url_prefix='/api/webhooks')
+
+# GitHub webhook event types and the action they trigger
+GITHUB_EVENT_ACTIONS = {
+    'star': 'new_star_on_repo',
+    'issues': 'new_issue_created',
+    'pull_request': 'new_pr_opened',
+}
+
+
+def verify_github_signature(payload, signature, secret):
+    """Check the X-Hub-Signature-256 header (HMAC-SHA256 of the raw body)"""
+    if not signature or not signature.startswith('sha256='):
+        return False
+
+    expected = hmac.new(secret.encode('utf-8'), payload, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature[len('sha256='):], expected)
+
+
+def _object(payload, key) -> dict:
+    """payload[key] when it is a JSON object, else an empty dict"""
+    value = payload.get(key)
+    return value if isinstance(value, dict) else {}
+
+
+def normalize_github_event(event_type, payload):
+    """Turn a GitHub webhook payload into (action_name, event_id, trigger_metadata)
+
+    Event ids match the ones the poller records (star:<user>, issue:<n>,
+    pr:<n>) so an event is handled once whichever path sees it first. Returns
+    None for events no action reacts to (unstar, issue edits, ...) and for
+    payloads missing the fields an event needs.
+    """
+    if event_type == 'star' and payload.get('action') == 'created':
+        user = _object(payload, 'sender').get('login')
+        if user:
+            return 'new_star_on_repo', f"star:{user}", f"New star from {user}"
+
+    if event_type == 'issues' and payload.get('action') == 'opened':
+        issue = _object(payload, 'issue')
+        if issue.get('number') is not None:
+            return 'new_issue_created', f"issue:{issue['number']}", f"Issue #{issue['number']}: {issue.get('title', '')}"
+
+    if event_type == 'pull_request' and payload.get('action') == 'opened':
+        pr = _object(payload, 'pull_request')
+        if pr.get('number') is not None:
+            return 'new_pr_opened', f"pr:{pr['number']}", f"PR #{pr['number']}: {pr.get('title', '')}"
+
+    return None
+
+
+def find_source_areas(source_key, action_names):
+    """Active areas watching a source with one of the given actions (indexed by source_key)"""
+    return UserArea.query.join(Action).filter(
+        UserArea.source_key == source_key,
+        UserArea.is_active == True,
+        Action.name.in_(action_names)
+    ).all()
+
+
+@webhooks_bp.route('/github', methods=['POST'])
+def github_webhook():
+    """Receive repository events pushed by GitHub"""
+    if not Config.GITHUB_WEBHOOK_SECRET:
+        return jsonify({'error': 'GitHub webhooks are not configured'}), 503
+
+    if not verify_github_signature(request.get_data(), request.headers.get('X-Hub-Signature-256'), Config.GITHUB_WEBHOOK_SECRET):
+        return jsonify({'error': 'Invalid signature'}), 401
+
+    event_type = request.headers.get('X-GitHub-Event')
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'message': 'Ignored: malformed payload', 'ignored': True}), 200
+
+    repo_name = _object(payload, 'repository').get('full_name')
+    if not repo_name:
+        return jsonify({'message': 'Ignored: no repository', 'ignored': True}), 200
+
+    source_key = github_source_key(repo_name)
+
+    # Sent when the webhook is created: its areas can stop polling right away
+    if event_type == 'ping':
+        events = _object(payload, 'hook').get('events') or []
+        action_names = list(GITHUB_EVENT_ACTIONS.values()) if '*' in events else [
+            GITHUB_EVENT_ACTIONS[event] for event in events if event in GITHUB_EVENT_ACTIONS
+        ]
+        areas = find_source_areas(source_key, action_names)
+        for area in areas:
+            area.push_enabled = True
+        db.session.commit()
+        return jsonify({'message': 'pong', 'workflows': len(areas)}), 200
+
+    if event_type not in GITHUB_EVENT_ACTIONS:
+        return jsonify({'message': f'Ignored event: {event_type}', 'ignored': True}), 200
+
+    areas = find_source_areas(source_key, [GITHUB_EVENT_ACTIONS[event_type]])
+    event = normalize_github_event(event_type, payload)
+
+    # This event type is delivered for the repository: matching areas only need fallback polling
+    now = datetime.now(timezone.utc)
+    for area in areas:
+        area.push_enabled = True
+        if event:
+            area.last_event_at = now
+    db.session.commit()
+
+    if not event:
+        return jsonify({'message': 'Ignored action', 'ignored': True, 'workflows': len(areas)}), 200
+
+    _, event_id, trigger_metadata = event
+    results = {'queued': 0, 'failed': 0, 'duplicate': 0}
+    for area in areas:
+        results[process_pushed_event(area, trigger_metadata, event_id)] += 1
+
+    return jsonify({'message': 'Event processed', 'workflows': results}), 200
+
+
+@webhooks_bp.route('/gmail', methods=['POST'])
+def gmail_push():
+    """Receive Gmail inbox change notifications from a Pub/Sub push subscription
+
+    Notifications carry no message, only the mailbox address and its new
+    historyId: the user's Gmail areas are made due so the scheduler runs an
+    incremental history sync for them on its next tick.
+    """
+    if not Config.GMAIL_PUSH_TOKEN:
+        return jsonify({'error': 'Gmail push notifications are not configured'}), 503
+
+    if not hmac.compare_digest(request.args.get('token', ''), Config.GMAIL_PUSH_TOKEN):
+        return jsonify({'error': 'Invalid token'}), 401
+
+    envelope = request.get_json(silent=True) or {}
+    try:
+        notification = json.loads(base64.b64decode(envelope['message']['data']))
+        email_address = notification['emailAddress'].lower()
+        history_id = int(notification['historyId'])
+    except (KeyError, TypeError, ValueError):
+        # Acknowledged anyway, Pub/Sub would redeliver a malformed message until it expires
+        return jsonify({'message': 'Ignored: malformed notification', 'ignored': True}), 200
+
+    connections = UserServiceConnection.query.filter_by(
+        service_id=get_service_id('gmail'),
+        account_email=email_address
+    ).all()
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    woken = 0
+    for connection in connections:
+        # The connection was already synced past this change
+        if connection.sync_cursor and int(connection.sync_cursor) >= history_id:
+            continue
+
+        woken += UserArea.query.filter(
+            UserArea.user_id == connection.user_id,
+            UserArea.is_active == True,
+            UserArea.action_id.in_(get_action_ids(GMAIL_PUSH_ACTIONS))
+        ).update({'next_fire_at': now, 'push_enabled': True}, synchronize_session=False)
+
+    db.session.commit()
+    return jsonify({'message': 'Notification processed', 'workflows': woken}), 200
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""Standalone scheduler process, run separately from the web app.
+
+Start as many instances as needed: workflows are split between them through
+shard leases stored in the database.
+"""
+import signal
+import sys
+from flask import Flask
+from config import Config
+from database.models import db
+from scheduler import run_scheduler
+
+app = Flask(__name__)
+app.config.from_object(Config)
+db.init_app(app)
+
+
+def handle_sigterm(signum, frame):
+    # Let run_scheduler release the shard leases before exiting
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    run_scheduler(app)
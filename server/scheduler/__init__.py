@@ -1,3 +1,4 @@
-from .core import init_scheduler, shutdown_scheduler
+from .core import init_scheduler, run_scheduler, shutdown_scheduler, last_tick_stats
+from .reaction_queue import last_drain_stats, queue_depth
 
-__all__ = ['init_scheduler', 'shutdown_scheduler']
+__all__ = ['init_scheduler', 'run_scheduler', 'shutdown_scheduler', 'last_tick_stats', 'last_drain_stats', 'queue_depth']
@@ -0,0 +1,20 @@
+import threading
+from config import Config
+
+# Semaphores by (pool, provider)
+_provider_semaphores = {}
+_provider_semaphores_lock = threading.Lock()
+
+
+def provider_slot(provider, pool='checks'):
+    """Return the semaphore capping concurrent calls to a provider from a worker pool
+
+    Action checks and reactions are capped separately so slow reactions never
+    hold up polling.
+    """
+    limit = Config.SCHEDULER_PROVIDER_CONCURRENCY if pool == 'checks' else Config.REACTION_PROVIDER_CONCURRENCY
+    key = (pool, provider)
+    with _provider_semaphores_lock:
+        if key not in _provider_semaphores:
+            _provider_semaphores[key] = threading.BoundedSemaphore(limit)
+        return _provider_semaphores[key]
@@ -0,0 +1,17 @@
+from database.catalog import get_service_id
+
+
+def get_user_connection(area, service_name):
+    """Return the area owner's connection to a service, or None
+
+    Reads area.user.service_connections, which the scheduler eager-loads with
+    the areas, so no query is issued per area.
+    """
+    service_id = get_service_id(service_name)
+    if service_id is None:
+        return None
+
+    return next(
+        (connection for connection in area.user.service_connections if connection.service_id == service_id),
+        None
+    )
@@ -1,159 +1,373 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from database.models import db, UserArea, WorkflowLog, Action
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, selectinload
+from database.models import db, User, UserArea, WorkflowLog, Action, Reaction
 from config import Config
+from utils.rate_limits import budget_snapshot
 from .actions import (
     check_time_matches, check_interval_elapsed, check_gmail_email_received,
     check_drive_new_file, check_facebook_new_post, check_github_repo_activity,
     check_spotify_activity
 )
-from .reactions import execute_reaction
+from .reaction_queue import enqueue_reaction, run_reaction_jobs, prune_dead_jobs
+from .concurrency import provider_slot
+from .ledger import filter_unprocessed, prune_processed_events
+from .timers import TIMER_ACTIONS
+from .polling import reschedule_poll
+from .watches import renew_gmail_watches
+from .digests import flush_email_digests
+from .rollups import compact_workflow_logs
+from .sharding import NODE_ID, claim_shards, release_shards, filter_owned_areas, publish_stats
+from .metrics import StatementCounter, install_statement_counter, track_statements
+from . import fetch_cache
 
 scheduler = None
+_scheduler_app = None
 _scheduler_lock_fd = None  # Keep lock file open to maintain lock
 
+# Summary of the most recent tick (published on the node's row for /health)
+last_tick_stats = {}
+
+
+def evaluate_action(area, action) -> tuple:
+    """Check if the area's action should trigger
+
+    Returns (should_trigger, trigger_metadata, result), result being the
+    action check's dict ('event_id' of the triggering event, 'defer_seconds'
+    when the provider asked to slow down), empty for timer actions.
+    """
+    should_trigger = False
+    trigger_metadata = None
+    result = {}
+
+    # Check action type
+    if action.name == 'time_matches':
+        should_trigger = check_time_matches(area)
+
+    elif action.name == 'interval_elapsed':
+        should_trigger = check_interval_elapsed(area)
+        if should_trigger:
+            interval_mins = area.action_config.get('interval_minutes', '?')
+            trigger_metadata = f"Interval elapsed ({interval_mins} min)"
+
+    elif action.name in ['email_received_from', 'email_subject_contains']:
+        result = check_gmail_email_received(area)
+        should_trigger = result.get('triggered', False)
+        if should_trigger:
+            email_data = result.get('email_data')
+            trigger_metadata = f"Email from {email_data['sender']}: {email_data['subject']}"
+
+    elif action.name in ['new_file_in_folder', 'new_file_uploaded']:
+        result = check_drive_new_file(area)
+        should_trigger = result.get('triggered', False)
+        if should_trigger:
+            file_data = result.get('file_data')
+            trigger_metadata = f"New file: {file_data['name']} (id:{file_data['id']})"
+
+    elif action.name in ['new_post_created', 'post_contains_keyword']:
+        result = check_facebook_new_post(area)
+        should_trigger = result.get('triggered', False)
+        if should_trigger:
+            post_data = result.get('post_data')
+            message_preview = post_data['message'][:50] if post_data['message'] else 'No message'
+            trigger_metadata = f"Facebook post: {message_preview}"
+
+    elif action.name in ['new_star_on_repo', 'new_issue_created', 'new_pr_opened']:
+        result = check_github_repo_activity(area)
+        should_trigger = result.get('triggered', False)
+        if should_trigger:
+            if action.name == 'new_star_on_repo':
+                star_data = result.get('star_data')
+                trigger_metadata = f"New star from {star_data['user']}"
+            elif action.name == 'new_issue_created':
+                issue_data = result.get('issue_data')
+                trigger_metadata = f"Issue #{issue_data['number']}: {issue_data['title']}"
+            elif action.name == 'new_pr_opened':
+                pr_data = result.get('pr_data')
+                trigger_metadata = f"PR #{pr_data['number']}: {pr_data['title']}"
+
+    elif action.name in ['track_added_to_playlist', 'track_saved', 'playback_started']:
+        result = check_spotify_activity(area)
+        should_trigger = result.get('triggered', False)
+        if should_trigger:
+            if action.name == 'track_added_to_playlist':
+                track_data = result.get('track_data')
+                trigger_metadata = f"Track added: {track_data['name']} by {track_data['artists']}"
+            elif action.name == 'track_saved':
+                track_data = result.get('track_data')
+                trigger_metadata = f"Track saved: {track_data['name']} by {track_data['artists']}"
+            elif action.name == 'playback_started':
+                playback_data = result.get('playback_data')
+                trigger_metadata = f"Now playing: {playback_data['track_name']} by {playback_data['artists']}"
+
+    return should_trigger, trigger_metadata, result
+
+
+def _log_area_error(area, error):
+    """Roll back the area's failed work and record the error in its logs"""
+    print(f"Error: Workflow {area.id} - {str(error)}")
+    try:
+        db.session.rollback()
+        log_entry = WorkflowLog(
+            area_id=area.id,
+            status='error',
+            message=f'Execution error: {str(error)}',
+            triggered_at=datetime.now(timezone.utc),
+            execution_time_ms=0
+        )
+        db.session.add(log_entry)
+        db.session.commit()
+    except:
+        pass
+
+
+def trigger_area(area, action, trigger_metadata, event_id) -> str:
+    """Queue the reaction of a triggered area and record the event as processed
+
+    The reaction itself runs on the reaction workers (see reaction_queue.py).
+    """
+    enqueue_reaction(area, action, trigger_metadata, event_id)
+    db.session.commit()
+    return 'queued'
+
+
+def process_pushed_event(area, trigger_metadata, event_id) -> str:
+    """Queue an area's reaction for an event a provider pushed by webhook
+
+    The event uses the same ledger id as polling, so whichever path sees it
+    first handles it. Returns 'queued', 'failed' or 'duplicate'.
+    """
+    try:
+        action = area.action
+        if not filter_unprocessed(area.id, action.service.name, [event_id]):
+            return 'duplicate'
+
+        return trigger_area(area, action, trigger_metadata, event_id)
+
+    except Exception as e:
+        _log_area_error(area, e)
+        return 'failed'
+
+
+def process_area(area) -> str:
+    """Check a single workflow and queue its reaction if triggered
+
+    Returns 'queued', 'failed', 'idle' or 'skipped'.
+    """
+    try:
+        # Check if the action should trigger
+        action = area.action
+
+        if not action:
+            return 'skipped'
+
+        with provider_slot(action.service.name):
+            should_trigger, trigger_metadata, check_result = evaluate_action(area, action)
+        event_id = check_result.get('event_id')
+
+        # Polled actions pick their next check from how active the source is
+        if action.name not in TIMER_ACTIONS:
+            reschedule_poll(area, action.name, should_trigger, defer_seconds=check_result.get('defer_seconds', 0))
+
+        if not should_trigger:
+            if db.session.dirty:
+                db.session.commit()
+            return 'idle'
+
+        return trigger_area(area, action, trigger_metadata, event_id)
+
+    except Exception as e:
+        _log_area_error(area, e)
+        return 'failed'
+
+
+def _active_areas_query(now):
+    """Active areas due this tick, with their action, reaction, services and the owner's connections
+
+    Areas are only loaded once their indexed next_fire_at is due (or not
+    computed yet): the next trigger time of timer areas, the next adaptive
+    poll of the others. Everything the checks and reactions read is loaded up
+    front (one joined query plus two selectin queries) instead of 6-8 lookups
+    per area.
+    """
+    return UserArea.query.options(
+        joinedload(UserArea.action).joinedload(Action.service),
+        joinedload(UserArea.reaction).joinedload(Reaction.service),
+        selectinload(UserArea.user).selectinload(User.service_connections)
+    ).filter(
+        UserArea.is_active == True,
+        or_(
+            UserArea.next_fire_at.is_(None),
+            UserArea.next_fire_at <= now.replace(tzinfo=None)
+        )
+    )
+
+
+def _process_area_in_worker(app, area, statements) -> str:
+    """Pool worker entry point: each worker runs in its own app context and DB session"""
+    with app.app_context(), track_statements(statements):
+        # Attach the preloaded area to this worker's session without querying it again
+        area = db.session.merge(area, load=False)
+        return process_area(area)
+
 
 def check_and_execute_workflows(app):
     """Main scheduler function: check all active workflows and execute if triggered"""
-    with app.app_context():
-        executed_count = 0
+    started = time.monotonic()
+    # Areas not started once a full interval has elapsed are skipped until the next tick
+    deadline = started + Config.SCHEDULER_CHECK_INTERVAL_MINUTES * 60
+    counts = {'queued': 0, 'failed': 0, 'idle': 0, 'skipped': 0}
+    fetch_cache.begin_tick()
 
-        try:
-            # Query all active workflows
-            active_areas = UserArea.query.filter(UserArea.is_active == True).all()
+    statements = StatementCounter()
 
-            for area in active_areas:
-                try:
-                    # Check if the action should trigger
-                    action = Action.query.get(area.action_id)
+    with app.app_context(), track_statements(statements):
+        install_statement_counter(db.engines.values())
 
-                    if not action:
+        try:
+            # Only check the workflows of the shards leased to this node
+            shard_ids = claim_shards()
+            last_tick_stats['shards'] = len(shard_ids)
+            now = fetch_cache.tick_now()
+            active_areas = filter_owned_areas(_active_areas_query(now), shard_ids).all() if shard_ids else []
+
+            if Config.SCHEDULER_MAX_WORKERS <= 1:
+                # Serial mode: check every workflow in this thread
+                for area in active_areas:
+                    if time.monotonic() > deadline:
+                        counts['skipped'] += 1
                         continue
+                    counts[process_area(area)] += 1
+
+            else:
+                # Concurrent mode: dispatch the preloaded areas to a bounded worker pool
+                db.session.remove()
 
-                    should_trigger = False
-                    trigger_metadata = None
-
-                    # Check action type
-                    if action.name == 'time_matches':
-                        should_trigger = check_time_matches(area)
-
-                    elif action.name == 'interval_elapsed':
-                        should_trigger = check_interval_elapsed(area)
-                        if should_trigger:
-                            interval_mins = area.action_config.get('interval_minutes', '?')
-                            trigger_metadata = f"Interval elapsed ({interval_mins} min)"
-
-                    elif action.name in ['email_received_from', 'email_subject_contains']:
-                        result = check_gmail_email_received(area)
-                        should_trigger = result.get('triggered', False)
-                        if should_trigger:
-                            email_data = result.get('email_data')
-                            trigger_metadata = f"Email from {email_data['sender']}: {email_data['subject']}"
-
-                    elif action.name in ['new_file_in_folder', 'new_file_uploaded']:
-                        result = check_drive_new_file(area)
-                        should_trigger = result.get('triggered', False)
-                        if should_trigger:
-                            file_data = result.get('file_data')
-                            trigger_metadata = f"New file: {file_data['name']} (id:{file_data['id']})"
-
-                    elif action.name in ['new_post_created', 'post_contains_keyword']:
-                        result = check_facebook_new_post(area)
-                        should_trigger = result.get('triggered', False)
-                        if should_trigger:
-                            post_data = result.get('post_data')
-                            message_preview = post_data['message'][:50] if post_data['message'] else 'No message'
-                            trigger_metadata = f"Facebook post: {message_preview}"
-
-                    elif action.name in ['new_star_on_repo', 'new_issue_created', 'new_pr_opened']:
-                        result = check_github_repo_activity(area)
-                        should_trigger = result.get('triggered', False)
-                        if should_trigger:
-                            if action.name == 'new_star_on_repo':
-                                star_data = result.get('star_data')
-                                trigger_metadata = f"New star from {star_data['user']}"
-                            elif action.name == 'new_issue_created':
-                                issue_data = result.get('issue_data')
-                                trigger_metadata = f"Issue #{issue_data['number']}: {issue_data['title']}"
-                            elif action.name == 'new_pr_opened':
-                                pr_data = result.get('pr_data')
-                                trigger_metadata = f"PR #{pr_data['number']}: {pr_data['title']}"
-
-                    elif action.name in ['track_added_to_playlist', 'track_saved', 'playback_started']:
-                        result = check_spotify_activity(area)
-                        should_trigger = result.get('triggered', False)
-                        if should_trigger:
-                            if action.name == 'track_added_to_playlist':
-                                track_data = result.get('track_data')
-                                trigger_metadata = f"Track added: {track_data['name']} by {track_data['artists']}"
-                            elif action.name == 'track_saved':
-                                track_data = result.get('track_data')
-                                trigger_metadata = f"Track saved: {track_data['name']} by {track_data['artists']}"
-                            elif action.name == 'playback_started':
-                                playback_data = result.get('playback_data')
-                                trigger_metadata = f"Now playing: {playback_data['track_name']} by {playback_data['artists']}"
-
-                    if should_trigger:
-                        # Execute the reaction
-                        start_time = datetime.now(timezone.utc)
-                        result = execute_reaction(area)
-                        end_time = datetime.now(timezone.utc)
-
-                        execution_time_ms = int((end_time - start_time).total_seconds() * 1000)
-
-                        # Update last_triggered timestamp
-                        area.last_triggered = start_time
-                        db.session.commit()
-
-                        # Log execution
-                        log_message = trigger_metadata if trigger_metadata else (result.get('message') or result.get('error', 'Unknown result'))
-                        log_entry = WorkflowLog(
-                            area_id=area.id,
-                            status='success' if result['success'] else 'failed',
-                            message=log_message,
-                            triggered_at=start_time,
-                            execution_time_ms=execution_time_ms
-                        )
-                        db.session.add(log_entry)
-                        db.session.commit()
-
-                        if result['success']:
-                            executed_count += 1
-                        else:
-                            print(f"Error: Workflow {area.id} failed - {result.get('error')}")
-
-                except Exception as e:
-                    print(f"Error: Workflow {area.id} - {str(e)}")
-                    # Log the error
+                with ThreadPoolExecutor(max_workers=Config.SCHEDULER_MAX_WORKERS, thread_name_prefix='area-worker') as pool:
+                    futures = [pool.submit(_process_area_in_worker, app, area, statements) for area in active_areas]
+                    wait(futures, timeout=max(deadline - time.monotonic(), 0))
+
+                    for future in futures:
+                        if future.cancel():
+                            counts['skipped'] += 1
+
+                for future in futures:
+                    if future.cancelled():
+                        continue
                     try:
-                        log_entry = WorkflowLog(
-                            area_id=area.id,
-                            status='error',
-                            message=f'Execution error: {str(e)}',
-                            triggered_at=datetime.now(timezone.utc),
-                            execution_time_ms=0
-                        )
-                        db.session.add(log_entry)
-                        db.session.commit()
-                    except:
-                        pass
+                        counts[future.result()] += 1
+                    except Exception as e:
+                        print(f"Scheduler worker error: {str(e)}")
+                        counts['failed'] += 1
 
         except Exception as e:
             print(f"Scheduler error: {str(e)}")
 
-        # Print summary only if workflows were executed
-        if executed_count > 0:
-            print(f"Scheduler: {executed_count} executed")
+    fetch_stats = fetch_cache.end_tick()
+    duration = time.monotonic() - started
+    last_tick_stats.update(counts)
+    last_tick_stats['provider_fetches'] = fetch_stats['fetches']
+    last_tick_stats['provider_fetches_shared'] = fetch_stats['hits']
+    last_tick_stats['sql_statements'] = statements.count
+    last_tick_stats['duration_seconds'] = round(duration, 3)
+    last_tick_stats['finished_at'] = datetime.now(timezone.utc).isoformat()
+
+    try:
+        with app.app_context():
+            publish_stats('last_tick', dict(last_tick_stats))
+            publish_stats('rate_limits', {'github': budget_snapshot('github')})
+    except Exception as e:
+        print(f"Scheduler stats error: {str(e)}")
+
+    # Print summary only if something happened
+    if counts['queued'] or counts['failed'] or counts['skipped']:
+        print(f"Scheduler: {counts['queued']} queued, {counts['failed']} failed, "
+              f"{counts['skipped']} skipped in {duration:.2f}s")
+
+
+def _add_jobs(sched, app):
+    """Register the scheduler jobs on an APScheduler instance"""
+    # Add job to check workflows every minute
+    sched.add_job(
+        func=lambda: check_and_execute_workflows(app),
+        trigger=IntervalTrigger(minutes=Config.SCHEDULER_CHECK_INTERVAL_MINUTES),
+        id='check_workflows',
+        name='Check and execute AREA workflows',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    # Prune the processed-event ledger
+    sched.add_job(
+        func=lambda: prune_processed_events(app),
+        trigger=IntervalTrigger(hours=6),
+        id='prune_processed_events',
+        name='Prune processed-event ledger',
+        replace_existing=True
+    )
+
+    # Run queued reactions apart from the polling tick
+    sched.add_job(
+        func=lambda: run_reaction_jobs(app),
+        trigger=IntervalTrigger(seconds=Config.REACTION_QUEUE_POLL_SECONDS),
+        id='run_reaction_jobs',
+        name='Run queued reactions',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    # Drop old dead-lettered reaction jobs
+    sched.add_job(
+        func=lambda: prune_dead_jobs(app),
+        trigger=IntervalTrigger(hours=6),
+        id='prune_dead_jobs',
+        name='Prune dead reaction jobs',
+        replace_existing=True
+    )
+    # Send buffered send_email notifications once their digest window ends
+    sched.add_job(
+        func=lambda: flush_email_digests(app),
+        trigger=IntervalTrigger(seconds=Config.EMAIL_DIGEST_FLUSH_SECONDS),
+        id='flush_email_digests',
+        name='Send due email digests',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    # Roll workflow logs up into hourly/daily stats, then drop expired ones
+    sched.add_job(
+        func=lambda: compact_workflow_logs(app),
+        trigger=IntervalTrigger(hours=1),
+        id='compact_workflow_logs',
+        name='Roll up and rotate workflow logs',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+    # Keep Gmail push notifications subscribed
+    sched.add_job(
+        func=lambda: renew_gmail_watches(app),
+        trigger=IntervalTrigger(hours=1),
+        id='renew_gmail_watches',
+        name='Renew Gmail mailbox watches',
+        replace_existing=True
+    )
+
+    with app.app_context():
+        install_statement_counter(db.engines.values())
 
 
 def init_scheduler(app):
     """
-    Initialize and start the background scheduler
+    Initialize and start the background scheduler inside the web process
     """
-    global scheduler
+    global scheduler, _scheduler_app
     import fcntl
-    import os
 
     if not Config.SCHEDULER_ENABLED:
         return None
@@ -162,7 +376,8 @@ def init_scheduler(app):
     if scheduler is not None and scheduler.running:
         return scheduler
 
-    # Use file lock to ensure only one scheduler across all workers
+    # Use file lock to run a single embedded scheduler per host; several hosts
+    # share the workflows through shard leases
     global _scheduler_lock_fd
     lock_file = '/tmp/area_scheduler.lock'
     try:
@@ -172,23 +387,48 @@ def init_scheduler(app):
         # Another process has the lock, skip scheduler initialization
         return None
 
+    _scheduler_app = app
     scheduler = BackgroundScheduler(timezone=Config.SCHEDULER_TIMEZONE)
-
-    # Add job to check workflows every minute
-    scheduler.add_job(
-        func=lambda: check_and_execute_workflows(app),
-        trigger=IntervalTrigger(minutes=Config.SCHEDULER_CHECK_INTERVAL_MINUTES),
-        id='check_workflows',
-        name='Check and execute AREA workflows',
-        replace_existing=True
-    )
+    _add_jobs(scheduler, app)
     scheduler.start()
-    print(f"Scheduler started (checks every {Config.SCHEDULER_CHECK_INTERVAL_MINUTES} min)")
+
+    print(f"Scheduler started (checks every {Config.SCHEDULER_CHECK_INTERVAL_MINUTES} min, "
+          f"{Config.SCHEDULER_MAX_WORKERS} workers, node {NODE_ID})")
     return scheduler
 
 
+def run_scheduler(app):
+    """Run the scheduler in the foreground (standalone scheduler process)"""
+    global scheduler, _scheduler_app
+
+    _scheduler_app = app
+    scheduler = BlockingScheduler(timezone=Config.SCHEDULER_TIMEZONE)
+    _add_jobs(scheduler, app)
+
+    # Check right away instead of waiting for the first interval
+    scheduler.add_job(func=lambda: check_and_execute_workflows(app), id='check_workflows_startup')
+
+    print(f"Standalone scheduler started (checks every {Config.SCHEDULER_CHECK_INTERVAL_MINUTES} min, "
+          f"{Config.SCHEDULER_MAX_WORKERS} workers, node {NODE_ID})")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        shutdown_scheduler()
+
+
 def shutdown_scheduler():
-    """Gracefully shutdown the scheduler"""
+    """Gracefully shutdown the scheduler and hand its shards over to other nodes"""
     global scheduler
     if scheduler:
-        scheduler.shutdown()
+        if scheduler.running:
+            scheduler.shutdown()
+        scheduler = None
+
+        if _scheduler_app is not None:
+            try:
+                with _scheduler_app.app_context():
+                    release_shards()
+            except Exception as e:
+                print(f"Error releasing scheduler shards: {str(e)}")
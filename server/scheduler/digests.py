@@ -0,0 +1,136 @@
+import smtplib
+from datetime import timedelta
+from database.models import db, EmailDigestItem
+from database.util import utcnow
+from utils.email_sender import build_message, smtp_configured
+from utils import smtp_pool
+from config import Config
+
+TRUNCATED_SUFFIX = '\n[truncated]'
+
+
+def digest_minutes(config) -> int:
+    """Digest window of a send_email reaction_config, 0 when digest mode is off"""
+    try:
+        minutes = int(config.get('digest_minutes') or 0)
+    except (TypeError, ValueError):
+        return 0
+    return max(0, min(minutes, Config.EMAIL_DIGEST_MAX_MINUTES))
+
+
+def queue_digest_item(area, to, subject, body, minutes):
+    """Buffer a notification for the recipient's next digest (committed by the caller)
+
+    The item is due `minutes` after it was queued. When any item of a recipient
+    is due, every item buffered for that recipient goes out with it.
+    """
+    now = utcnow()
+    db.session.add(EmailDigestItem(
+        area_id=area.id,
+        recipient=to.strip().lower(),
+        subject=subject[:255],
+        body=body,
+        created_at=now,
+        flush_at=now + timedelta(minutes=minutes)
+    ))
+
+
+def _truncate(text, max_bytes):
+    encoded = text.encode('utf-8')
+    if len(encoded) <= max_bytes:
+        return text
+    keep = max(max_bytes - len(TRUNCATED_SUFFIX), 0)
+    return encoded[:keep].decode('utf-8', 'ignore') + TRUNCATED_SUFFIX
+
+
+def _format_item(item) -> str:
+    return f"[{item.created_at:%Y-%m-%d %H:%M} UTC] {item.subject}\n\n{item.body}\n\n---\n\n"
+
+
+def build_digest_messages(recipient, items) -> list:
+    """Split a recipient's items into digest messages within the size limits
+
+    Returns (message, items) pairs. A message holds at most
+    EMAIL_DIGEST_MAX_ITEMS items and EMAIL_DIGEST_MAX_BYTES of body; a single
+    item larger than that is truncated.
+    """
+    chunks = []
+    for item in items:
+        entry = _truncate(_format_item(item), Config.EMAIL_DIGEST_MAX_BYTES)
+        size = len(entry.encode('utf-8'))
+        if (
+            not chunks
+            or len(chunks[-1]['items']) >= Config.EMAIL_DIGEST_MAX_ITEMS
+            or chunks[-1]['size'] + size > Config.EMAIL_DIGEST_MAX_BYTES
+        ):
+            chunks.append({'items': [], 'entries': [], 'size': 0})
+        chunks[-1]['items'].append(item)
+        chunks[-1]['entries'].append(entry)
+        chunks[-1]['size'] += size
+
+    subjects = {item.subject for item in items}
+    title = subjects.pop() if len(subjects) == 1 else 'AREA digest'
+
+    messages = []
+    for index, chunk in enumerate(chunks, start=1):
+        count = len(chunk['items'])
+        subject = f"{title} ({count} notification{'s' if count > 1 else ''})"
+        if len(chunks) > 1:
+            subject += f" [{index}/{len(chunks)}]"
+        body = f"{count} notification{'s' if count > 1 else ''} from your AREA workflows:\n\n" + ''.join(chunk['entries'])
+        messages.append((build_message(recipient, subject, body), chunk['items']))
+    return messages
+
+
+def flush_email_digests(app) -> int:
+    """Send the digests of recipients with a due item, one transaction per recipient
+
+    A recipient's items are locked with FOR UPDATE SKIP LOCKED while its
+    messages are sent, back to back over one SMTP connection, so two nodes
+    never send the same digest. Unsent items stay queued (and are retried on
+    the next run) when sending fails, except for recipients the SMTP server
+    refuses. Returns the number of messages sent.
+    """
+    with app.app_context():
+        recipients = [recipient for (recipient,) in db.session.query(EmailDigestItem.recipient).filter(
+            EmailDigestItem.flush_at <= utcnow()
+        ).distinct().all()]
+        db.session.commit()
+
+        # Digests are only queued with credentials set, they were removed since
+        if recipients and not smtp_configured():
+            print(f"Email digests for {len(recipients)} recipients not sent: SMTP credentials not configured")
+            return 0
+
+        sent = 0
+        for recipient in recipients:
+            items = EmailDigestItem.query.filter_by(recipient=recipient).order_by(
+                EmailDigestItem.created_at, EmailDigestItem.id
+            ).with_for_update(skip_locked=True).all()
+            if not any(item.flush_at <= utcnow() for item in items):
+                db.session.rollback()  # Another node is sending this digest
+                continue
+
+            messages = build_digest_messages(recipient, items)
+            chunks = {id(message): chunk for message, chunk in messages}
+            delivered = []
+
+            def delete_items(message):
+                # Delete each part once sent so a later failure does not resend it
+                delivered.append(message)
+                for item in chunks.pop(id(message)):
+                    db.session.delete(item)
+
+            try:
+                smtp_pool.send_messages([message for message, _ in messages], on_sent=delete_items)
+            except smtplib.SMTPRecipientsRefused as e:
+                print(f"Email digest for {recipient} dropped - recipient refused: {str(e)}")
+                for chunk in chunks.values():
+                    for item in chunk:
+                        db.session.delete(item)
+            except Exception as e:
+                print(f"Email digest for {recipient} failed, retrying next run: {str(e)}")
+            sent += len(delivered)
+            db.session.commit()
+
+        return sent
@@ -0,0 +1,82 @@
+import threading
+from datetime import datetime, timezone
+
+# Provider responses fetched during the current tick, keyed by (user, provider, endpoint, params)
+_entries = None
+_entries_lock = threading.Lock()
+_tick_started_at = None
+_stats = {'fetches': 0, 'hits': 0}
+
+
+class _Entry:
+    """A single upstream fetch shared by every workflow of the tick reading it"""
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.value = None
+        self.error = None
+
+
+def begin_tick():
+    """Start a new tick: reset the cache and freeze the tick's reference time"""
+    global _entries, _tick_started_at
+    with _entries_lock:
+        _entries = {}
+        _tick_started_at = datetime.now(timezone.utc)
+        _stats['fetches'] = 0
+        _stats['hits'] = 0
+
+
+def end_tick() -> dict:
+    """Drop cached responses and return the fetch statistics of the tick"""
+    global _entries, _tick_started_at
+    with _entries_lock:
+        _entries = None
+        _tick_started_at = None
+        return dict(_stats)
+
+
+def tick_now() -> datetime:
+    """Return the tick start time (or the current time outside a tick)
+
+    Lookback windows are computed from this so that every workflow of a tick
+    builds the same request parameters and shares the same cache entry.
+    """
+    return _tick_started_at or datetime.now(timezone.utc)
+
+
+def cached_fetch(user_id, provider, endpoint, params, fetch):
+    """Call fetch() once per tick for a given (user, provider, endpoint, params)
+
+    Concurrent callers asking for the same key wait for the first fetch to
+    complete instead of issuing their own request. Outside a tick the call is
+    passed straight through.
+    """
+    key = (user_id, provider, endpoint, tuple(sorted((params or {}).items())))
+
+    with _entries_lock:
+        if _entries is None:
+            return fetch()
+
+        entry = _entries.get(key)
+        owner = entry is None
+        if owner:
+            entry = _Entry()
+            _entries[key] = entry
+            _stats['fetches'] += 1
+        else:
+            _stats['hits'] += 1
+
+    if owner:
+        try:
+            entry.value = fetch()
+        except Exception as e:
+            entry.error = e
+        finally:
+            entry.ready.set()
+    else:
+        entry.ready.wait()
+
+    if entry.error is not None:
+        raise entry.error
+    return entry.value
@@ -0,0 +1,92 @@
+from datetime import datetime, timezone, timedelta
+from database.models import db, ProcessedEvent
+from database.util import delete_in_batches
+from config import Config
+from .polling import lookback_since
+
+
+def filter_unprocessed(area_id, provider, event_ids) -> set:
+    """Return the subset of event_ids not yet processed by the area (single query)"""
+    event_ids = {str(event_id) for event_id in event_ids if event_id is not None}
+    if not event_ids:
+        return set()
+
+    processed = db.session.query(ProcessedEvent.external_event_id).filter(
+        ProcessedEvent.area_id == area_id,
+        ProcessedEvent.provider == provider,
+        ProcessedEvent.external_event_id.in_(event_ids)
+    ).all()
+
+    return event_ids - {event_id for (event_id,) in processed}
+
+
+def unprocessed_events(area, provider, event_ids) -> set:
+    """filter_unprocessed for polled actions, seeding the ledger on an existing area's first poll
+
+    An area older than the lookback window that was never polled with the
+    ledger (it existed before the upgrade) has its current events recorded
+    as processed instead of triggering on them: they may have been handled
+    before the deploy. New areas need no seeding, their lookback starts at
+    their creation (see lookback_since).
+    """
+    unprocessed = filter_unprocessed(area.id, provider, event_ids)
+
+    # reschedule_poll sets the poll interval after every check, it is unset until the first one
+    first_poll = area.poll_interval_seconds is None
+    if unprocessed and first_poll and lookback_since(area) <= lookback_since():
+        for event_id in unprocessed:
+            mark_processed(area.id, provider, event_id)
+        return set()
+
+    return unprocessed
+
+
+def last_processed_at(area_id, provider, event_id):
+    """Return when the area last processed an event, or None"""
+    processed_at = db.session.query(ProcessedEvent.processed_at).filter_by(
+        area_id=area_id,
+        provider=provider,
+        external_event_id=str(event_id)
+    ).scalar()
+
+    if processed_at and processed_at.tzinfo is None:
+        processed_at = processed_at.replace(tzinfo=timezone.utc)
+    return processed_at
+
+
+def mark_processed(area_id, provider, event_id, processed_at=None):
+    """Record an event as processed by the area (committed by the caller)"""
+    processed_at = processed_at or datetime.now(timezone.utc)
+
+    entry = ProcessedEvent.query.filter_by(
+        area_id=area_id,
+        provider=provider,
+        external_event_id=str(event_id)
+    ).first()
+
+    if entry:
+        entry.processed_at = processed_at
+    else:
+        db.session.add(ProcessedEvent(
+            area_id=area_id,
+            provider=provider,
+            external_event_id=str(event_id),
+            processed_at=processed_at
+        ))
+
+
+def prune_processed_events(app, batch_size=5000) -> int:
+    """Delete ledger entries older than PROCESSED_EVENT_TTL_DAYS, in bounded batches"""
+    with app.app_context():
+        cutoff = datetime.now(timezone.utc) - timedelta(days=Config.PROCESSED_EVENT_TTL_DAYS)
+        deleted = 0
+
+        try:
+            deleted = delete_in_batches(ProcessedEvent, ProcessedEvent.processed_at < cutoff, batch_size=batch_size)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Ledger pruning error: {str(e)}")
+
+        if deleted:
+            print(f"Ledger: pruned {deleted} processed events")
+        return deleted
@@ -0,0 +1,51 @@
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_instrumented_engines = set()
+
+
+class StatementCounter:
+    """Number of SQL statements issued by the threads tracking into it (one per tick)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self):
+        with self._lock:
+            self.count += 1
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = getattr(_local, 'counter', None)
+    if counter is not None:
+        counter.add()
+
+
+def install_statement_counter(engines):
+    """Count the SQL statements sent to these engines (primary and replica) from threads inside track_statements()"""
+    for engine in engines:
+        with _install_lock:
+            if id(engine) in _instrumented_engines:
+                continue
+            _instrumented_engines.add(id(engine))
+        event.listen(engine, 'before_cursor_execute', _count_statement)
+
+
+@contextmanager
+def track_statements(counter):
+    """Count the statements executed by the current thread into `counter`
+
+    Pool workers are separate threads: each one enters track_statements() with
+    the tick's counter so its statements add up with the tick's, and nothing
+    run by other threads (web requests, the reaction queue) is counted.
+    """
+    previous = getattr(_local, 'counter', None)
+    _local.counter = counter
+    try:
+        yield counter
+    finally:
+        _local.counter = previous
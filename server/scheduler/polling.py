@@ -0,0 +1,70 @@
+from datetime import timezone, timedelta
+from config import Config
+from .fetch_cache import tick_now
+
+# Optional per-action (min, max) poll intervals in seconds, None falls back to the global bounds
+POLL_BOUNDS = {
+    'playback_started': (None, 120),  # Playback sessions are short, a slow poll would miss them
+}
+
+
+def poll_bounds(action_name) -> tuple:
+    """Return the (min, max) poll interval of an action, in seconds"""
+    tick_seconds = Config.SCHEDULER_CHECK_INTERVAL_MINUTES * 60
+    min_seconds, max_seconds = POLL_BOUNDS.get(action_name, (None, None))
+
+    # Polling faster than the scheduler ticks is not possible
+    min_seconds = max(min_seconds or Config.SCHEDULER_POLL_MIN_SECONDS, tick_seconds)
+    max_seconds = max(max_seconds or Config.SCHEDULER_POLL_MAX_SECONDS, min_seconds)
+    return min_seconds, max_seconds
+
+
+def reschedule_poll(area, action_name, had_event, now=None, defer_seconds=0):
+    """Set the area's next poll: back off exponentially while quiet, reset to the minimum on activity
+
+    defer_seconds pushes the next poll further out when the provider asked
+    to slow down (e.g. a rate limit budget running low).
+    """
+    now = now or tick_now()
+    min_seconds, max_seconds = poll_bounds(action_name)
+
+    if area.push_enabled:
+        # Events arrive by webhook: only poll at the slowest pace, to catch missed deliveries
+        interval = max_seconds
+        if had_event:
+            area.last_event_at = now
+    elif had_event:
+        interval = min_seconds
+        area.last_event_at = now
+    else:
+        current = area.poll_interval_seconds or min_seconds
+        interval = min(int(current * Config.SCHEDULER_POLL_BACKOFF_FACTOR), max_seconds)
+        interval = max(interval, min_seconds)
+
+    area.poll_interval_seconds = interval
+
+    # Scheduled half a tick early so the poll falls due on the intended tick despite timing jitter
+    tick_seconds = Config.SCHEDULER_CHECK_INTERVAL_MINUTES * 60
+    delay = max(interval - tick_seconds / 2, defer_seconds)
+    area.next_fire_at = (now + timedelta(seconds=delay)).replace(tzinfo=None)
+
+
+def lookback_since(area=None):
+    """Start of the window polled actions fetch events from
+
+    Covers the longest poll interval plus one tick so no event is missed
+    while an area backs off; already processed events are filtered out by the
+    ledger. The window is the same for every area so fetches stay shared,
+    except that an area created within it only looks back to its creation:
+    events that happened before the workflow existed never trigger it.
+    """
+    tick_seconds = Config.SCHEDULER_CHECK_INTERVAL_MINUTES * 60
+    window = max(300, Config.SCHEDULER_POLL_MAX_SECONDS + tick_seconds)
+    since = tick_now() - timedelta(seconds=window)
+
+    if area is not None and area.created_at is not None:
+        created_at = area.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        since = max(since, created_at)
+    return since
@@ -0,0 +1,219 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import or_, and_, func
+from database.models import db, ReactionJob, SchedulerNode, WorkflowLog
+from database.util import utcnow
+from config import Config
+from utils.http_client import is_retryable
+from .reactions import execute_reaction
+from .ledger import mark_processed
+from .timers import TIMER_ACTIONS, schedule_area
+from .sharding import NODE_ID, live_nodes, publish_stats
+from .concurrency import provider_slot
+
+# Summary of the most recent queue drain (published on the node's row for /health)
+last_drain_stats = {}
+
+
+def enqueue_reaction(area, action, trigger_metadata, event_id, triggered_at=None):
+    """Record that the area triggered and queue its reaction (committed by the caller)
+
+    The ledger entry and the job are written in the same transaction, so a
+    provider event is queued exactly once whichever path (poll, webhook) saw it.
+    """
+    triggered_at = triggered_at or datetime.now(timezone.utc)
+
+    area.last_triggered = triggered_at
+    if action.name in TIMER_ACTIONS:
+        schedule_area(area, action.name, triggered_at)
+    if event_id is not None:
+        mark_processed(area.id, action.service.name, event_id, processed_at=triggered_at)
+
+    reaction = area.reaction
+    db.session.add(ReactionJob(
+        area_id=area.id,
+        provider=reaction.service.name if reaction else 'unknown',
+        trigger_message=trigger_metadata,
+        triggered_at=triggered_at.replace(tzinfo=None),
+        run_at=triggered_at.replace(tzinfo=None)
+    ))
+
+
+def claim_jobs(limit) -> list:
+    """Lock up to `limit` due jobs for this node and return their ids
+
+    Pending jobs whose run_at has come are selected with FOR UPDATE SKIP
+    LOCKED so concurrent nodes never claim the same job. A running job is only
+    taken over once its lock expired and the node that claimed it stopped
+    heartbeating: a live node may still be running a slow reaction, which
+    would otherwise run twice.
+    """
+    now = utcnow()
+    live_node_ids = live_nodes(now).with_entities(SchedulerNode.node_id)
+    jobs = ReactionJob.query.filter(
+        or_(
+            and_(ReactionJob.status == 'pending', ReactionJob.run_at <= now),
+            and_(
+                ReactionJob.status == 'running',
+                ReactionJob.locked_until < now,
+                or_(ReactionJob.locked_by.is_(None), ReactionJob.locked_by.not_in(live_node_ids))
+            )
+        )
+    ).order_by(ReactionJob.run_at).limit(limit).with_for_update(skip_locked=True).all()
+
+    job_ids = [job.id for job in jobs]
+    if job_ids:
+        ReactionJob.query.filter(ReactionJob.id.in_(job_ids)).update({
+            'status': 'running',
+            'attempts': ReactionJob.attempts + 1,
+            'locked_by': NODE_ID,
+            'locked_until': now + timedelta(seconds=Config.REACTION_JOB_TIMEOUT_SECONDS)
+        }, synchronize_session=False)
+    db.session.commit()
+    return job_ids
+
+
+def _log_result(job, status, message, execution_time_ms):
+    db.session.add(WorkflowLog(
+        area_id=job.area_id,
+        status=status,
+        message=message,
+        triggered_at=job.triggered_at,
+        execution_time_ms=execution_time_ms
+    ))
+
+
+def run_job(app, job_id) -> str:
+    """Run a claimed job in its own app context and DB session
+
+    Succeeded jobs are logged and deleted. Transient failures (timeouts, 429,
+    5xx, SMTP 4xx) are retried with exponential backoff and dead-lettered (kept
+    with status 'dead') after REACTION_JOB_MAX_ATTEMPTS; permanent ones (missing
+    config or connection, 4xx) are dead-lettered on the first attempt. Every
+    failed attempt writes a workflow log. Returns 'executed', 'retried', 'dead'
+    or 'skipped'.
+    """
+    with app.app_context():
+        job = db.session.get(ReactionJob, job_id)
+        if job is None or job.locked_by != NODE_ID:
+            return 'skipped'  # The lock expired and another node took the job
+
+        area = job.area
+        if area is None:
+            db.session.delete(job)
+            db.session.commit()
+            return 'skipped'
+
+        start_time = datetime.now(timezone.utc)
+        try:
+            with provider_slot(job.provider, 'reactions'):
+                result = execute_reaction(area)
+        except Exception as e:
+            db.session.rollback()
+            result = {'success': False, 'error': f'Execution error: {str(e)}', 'retryable': is_retryable(e)}
+        execution_time_ms = int((datetime.now(timezone.utc) - start_time).total_seconds() * 1000)
+
+        if result['success']:
+            _log_result(job, 'success', job.trigger_message or result.get('message') or 'Unknown result', execution_time_ms)
+            db.session.delete(job)
+            db.session.commit()
+            return 'executed'
+
+        error = result.get('error', 'Unknown result')
+        job.last_error = error
+        job.locked_by = None
+        job.locked_until = None
+
+        # Results without a retryable flag are configuration errors, another attempt would fail the same way
+        if not result.get('retryable') or job.attempts >= Config.REACTION_JOB_MAX_ATTEMPTS:
+            job.status = 'dead'
+            _log_result(job, 'failed', f"Failed after {job.attempts} attempt(s): {error}", execution_time_ms)
+            db.session.commit()
+            print(f"Error: Workflow {job.area_id} failed after {job.attempts} attempt(s) - {error}")
+            return 'dead'
+
+        backoff_seconds = Config.REACTION_JOB_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        job.status = 'pending'
+        job.run_at = utcnow() + timedelta(seconds=backoff_seconds)
+        _log_result(job, 'error', f"Attempt {job.attempts} failed, retrying in {backoff_seconds}s: {error}", execution_time_ms)
+        db.session.commit()
+        return 'retried'
+
+
+def release_job(job_id):
+    """Put a job whose worker crashed back in the queue (this node stays live, so claim_jobs would skip it)"""
+    ReactionJob.query.filter_by(id=job_id, locked_by=NODE_ID).update(
+        {'status': 'pending', 'locked_by': None, 'locked_until': None}, synchronize_session=False
+    )
+    db.session.commit()
+
+
+def run_reaction_jobs(app):
+    """Drain due reaction jobs with a pool of REACTION_WORKERS threads
+
+    Runs every REACTION_QUEUE_POLL_SECONDS, separately from the polling tick,
+    so reaction latency (SMTP, uploads) never delays action checks. A new job
+    is claimed as soon as a worker frees up, until none are due.
+    """
+    counts = {'executed': 0, 'retried': 0, 'dead': 0, 'skipped': 0}
+    in_flight = set()
+    claimed = {}
+
+    with ThreadPoolExecutor(max_workers=Config.REACTION_WORKERS, thread_name_prefix='reaction-worker') as pool:
+        while True:
+            free_workers = Config.REACTION_WORKERS - len(in_flight)
+            if free_workers > 0:
+                try:
+                    with app.app_context():
+                        job_ids = claim_jobs(free_workers)
+                except Exception as e:
+                    print(f"Reaction queue error: {str(e)}")
+                    job_ids = []
+                for job_id in job_ids:
+                    future = pool.submit(run_job, app, job_id)
+                    claimed[future] = job_id
+                    in_flight.add(future)
+
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_id = claimed.pop(future)
+                try:
+                    counts[future.result()] += 1
+                except Exception as e:
+                    print(f"Reaction worker error: {str(e)}")
+                    counts['skipped'] += 1
+                    try:
+                        with app.app_context():
+                            release_job(job_id)
+                    except Exception as release_error:
+                        print(f"Reaction queue error: {str(release_error)}")
+
+    if any(counts.values()):
+        last_drain_stats.update(counts)
+        last_drain_stats['finished_at'] = datetime.now(timezone.utc).isoformat()
+
+        try:
+            with app.app_context():
+                publish_stats('last_drain', dict(last_drain_stats))
+        except Exception as e:
+            print(f"Reaction queue stats error: {str(e)}")
+
+
+def queue_depth() -> dict:
+    """Number of queued reaction jobs by status"""
+    return dict(db.session.query(ReactionJob.status, func.count(ReactionJob.id)).group_by(ReactionJob.status).all())
+
+
+def prune_dead_jobs(app) -> int:
+    """Delete dead-lettered jobs older than PROCESSED_EVENT_TTL_DAYS"""
+    with app.app_context():
+        cutoff = utcnow() - timedelta(days=Config.PROCESSED_EVENT_TTL_DAYS)
+        deleted = ReactionJob.query.filter(
+            ReactionJob.status == 'dead',
+            ReactionJob.created_at < cutoff
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
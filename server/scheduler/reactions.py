@@ -1,8 +1,10 @@
-from database.models import Reaction, UserServiceConnection, Service
-from utils.email_sender import send_email
+from .connections import get_user_connection
+from .digests import digest_minutes, queue_digest_item
+from utils.email_sender import send_email, smtp_configured, missing_credentials_result
 from utils.drive_client import create_drive_service, get_folder_id_by_name, create_file, create_folder, share_file
 from utils.facebook_client import create_post
 from utils.github_client import create_issue
+from utils.http_client import is_retryable
 from utils.spotify_client import (
     get_user_profile, add_track_to_playlist,
     create_playlist as spotify_create_playlist, start_playback
@@ -22,6 +24,18 @@ def execute_send_email(area) -> dict:
             'error': 'No recipient email specified in reaction_config'
         }
 
+    # Digest mode: buffer the notification, flush_email_digests sends it with the others
+    minutes = digest_minutes(config)
+    if minutes:
+        # Fail now like send_email would, a digest queued without credentials is never sent
+        if not smtp_configured():
+            return missing_credentials_result()
+        queue_digest_item(area, to_email, subject, body, minutes)
+        return {
+            'success': True,
+            'message': f'Email to {to_email} queued for the next digest'
+        }
+
     # Send the email
     result = send_email(to_email, subject, body, html=False)
     return result
@@ -30,20 +44,13 @@ def execute_send_email(area) -> dict:
 def execute_drive_create_file(area) -> dict:
     """Execute the create_file reaction for Google Drive"""
     # Get user's Drive connection
-    drive_service = Service.query.filter_by(name='drive').first()
-    if not drive_service:
-        return {'success': False, 'error': 'Drive service not found'}
-
-    connection = UserServiceConnection.query.filter_by(
-        user_id=area.user_id,
-        service_id=drive_service.id
-    ).first()
+    connection = get_user_connection(area, 'drive')
 
     if not connection:
         return {'success': False, 'error': 'Drive not connected'}
 
     # Create Drive API service
-    drive_api = create_drive_service(connection.access_token, connection.refresh_token)
+    drive_api = create_drive_service(connection.access_token, connection.refresh_token, connection.token_expires_at)
     if not drive_api:
         return {'success': False, 'error': 'Failed to create Drive service'}
 
@@ -74,20 +81,13 @@ def execute_drive_create_file(area) -> dict:
 def execute_drive_create_folder(area) -> dict:
     """Execute the create_folder reaction for Google Drive"""
     # Get user's Drive connection
-    drive_service = Service.query.filter_by(name='drive').first()
-    if not drive_service:
-        return {'success': False, 'error': 'Drive service not found'}
-
-    connection = UserServiceConnection.query.filter_by(
-        user_id=area.user_id,
-        service_id=drive_service.id
-    ).first()
+    connection = get_user_connection(area, 'drive')
 
     if not connection:
         return {'success': False, 'error': 'Drive not connected'}
 
     # Create Drive API service
-    drive_api = create_drive_service(connection.access_token, connection.refresh_token)
+    drive_api = create_drive_service(connection.access_token, connection.refresh_token, connection.token_expires_at)
     if not drive_api:
         return {'success': False, 'error': 'Failed to create Drive service'}
 
@@ -109,20 +109,13 @@ def execute_drive_create_folder(area) -> dict:
 def execute_drive_share_file(area) -> dict:
     """Execute the share_file reaction for Google Drive"""
     # Get user's Drive connection
-    drive_service = Service.query.filter_by(name='drive').first()
-    if not drive_service:
-        return {'success': False, 'error': 'Drive service not found'}
-
-    connection = UserServiceConnection.query.filter_by(
-        user_id=area.user_id,
-        service_id=drive_service.id
-    ).first()
+    connection = get_user_connection(area, 'drive')
 
     if not connection:
         return {'success': False, 'error': 'Drive not connected'}
 
     # Create Drive API service
-    drive_api = create_drive_service(connection.access_token, connection.refresh_token)
+    drive_api = create_drive_service(connection.access_token, connection.refresh_token, connection.token_expires_at)
     if not drive_api:
         return {'success': False, 'error': 'Failed to create Drive service'}
 
@@ -157,20 +150,13 @@ def execute_drive_share_file(area) -> dict:
         return result
 
     except Exception as e:
-        return {'success': False, 'error': str(e)}
+        return {'success': False, 'error': str(e), 'retryable': is_retryable(e)}
 
 
 def execute_facebook_create_post(area) -> dict:
     """Execute the create_post reaction for Facebook"""
     # Get user's Facebook connection
-    facebook_service = Service.query.filter_by(name='facebook').first()
-    if not facebook_service:
-        return {'success': False, 'error': 'Facebook service not found'}
-
-    connection = UserServiceConnection.query.filter_by(
-        user_id=area.user_id,
-        service_id=facebook_service.id
-    ).first()
+    connection = get_user_connection(area, 'facebook')
 
     if not connection:
         return {'success': False, 'error': 'Facebook not connected'}
@@ -190,14 +176,7 @@ def execute_facebook_create_post(area) -> dict:
 def execute_github_create_issue(area) -> dict:
     """Execute the create_issue reaction for GitHub"""
     # Get user's GitHub connection
-    github_service = Service.query.filter_by(name='github').first()
-    if not github_service:
-        return {'success': False, 'error': 'GitHub service not found'}
-
-    connection = UserServiceConnection.query.filter_by(
-        user_id=area.user_id,
-        service_id=github_service.id
-    ).first()
+    connection = get_user_connection(area, 'github')
 
     if not connection:
         return {'success': False, 'error': 'GitHub not connected'}
@@ -219,14 +198,7 @@ def execute_github_create_issue(area) -> dict:
 def execute_spotify_add_to_playlist(area) -> dict:
     """Execute the add_to_playlist reaction for Spotify"""
     # Get user's Spotify connection
-    spotify_service = Service.query.filter_by(name='spotify').first()
-    if not spotify_service:
-        return {'success': False, 'error': 'Spotify service not found'}
-
-    connection = UserServiceConnection.query.filter_by(
-        user_id=area.user_id,
-        service_id=spotify_service.id
-    ).first()
+    connection = get_user_connection(area, 'spotify')
 
     if not connection:
         return {'success': False, 'error': 'Spotify not connected'}
@@ -247,14 +219,7 @@ def execute_spotify_add_to_playlist(area) -> dict:
 def execute_spotify_create_playlist(area) -> dict:
     """Execute the create_playlist reaction for Spotify"""
     # Get user's Spotify connection
-    spotify_service = Service.query.filter_by(name='spotify').first()
-    if not spotify_service:
-        return {'success': False, 'error': 'Spotify service not found'}
-
-    connection = UserServiceConnection.query.filter_by(
-        user_id=area.user_id,
-        service_id=spotify_service.id
-    ).first()
+    connection = get_user_connection(area, 'spotify')
 
     if not connection:
         return {'success': False, 'error': 'Spotify not connected'}
@@ -281,14 +246,7 @@ def execute_spotify_create_playlist(area) -> dict:
 def execute_spotify_start_playback(area) -> dict:
     """Execute the start_playback reaction for Spotify"""
     # Get user's Spotify connection
-    spotify_service = Service.query.filter_by(name='spotify').first()
-    if not spotify_service:
-        return {'success': False, 'error': 'Spotify service not found'}
-
-    connection = UserServiceConnection.query.filter_by(
-        user_id=area.user_id,
-        service_id=spotify_service.id
-    ).first()
+    connection = get_user_connection(area, 'spotify')
 
     if not connection:
         return {'success': False, 'error': 'Spotify not connected'}
@@ -305,7 +263,7 @@ def execute_spotify_start_playback(area) -> dict:
 
 def execute_reaction(area) -> dict:
     """Execute the appropriate reaction based on the reaction type"""
-    reaction = Reaction.query.get(area.reaction_id)
+    reaction = area.reaction
 
     if not reaction:
         return {
@@ -0,0 +1,199 @@
+import math
+import zlib
+from datetime import timedelta
+from sqlalchemy import func, case
+from sqlalchemy.dialects import postgresql, sqlite
+from database.models import db, WorkflowLog, WorkflowLogRollup
+from database.util import utcnow, delete_in_batches, try_advisory_lock
+from database.partitioning import rotate_workflow_logs
+from config import Config
+
+BUCKETS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+
+# Bounds a single run when catching up on a backlog (first deployment, downtime)
+MAX_BUCKETS_PER_RUN = {'hour': 24 * 7, 'day': 7}
+
+# Advisory lock held by the node compacting logs, so a single node rolls up and rotates at a time
+COMPACTION_LOCK_ID = zlib.crc32(b'workflow_logs_compaction')
+
+AGGREGATE_COLUMNS = ('count', 'success_count', 'failed_count', 'error_count',
+                     'p50_execution_time_ms', 'p95_execution_time_ms')
+
+
+def _floor(moment, granularity):
+    if granularity == 'day':
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _percentile(sorted_values, ratio):
+    """Nearest-rank percentile, like PostgreSQL's percentile_disc"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(ratio * len(sorted_values)) - 1, 0)]
+
+
+def _aggregate(start, end) -> list:
+    """Per-area counts and execution time percentiles of the logs in [start, end)"""
+    in_bucket = (WorkflowLog.triggered_at >= start, WorkflowLog.triggered_at < end)
+
+    if db.engine.dialect.name == 'postgresql':
+        rows = db.session.query(
+            WorkflowLog.area_id,
+            func.count(WorkflowLog.id),
+            func.sum(case((WorkflowLog.status == 'success', 1), else_=0)),
+            func.sum(case((WorkflowLog.status == 'failed', 1), else_=0)),
+            func.sum(case((WorkflowLog.status == 'error', 1), else_=0)),
+            func.percentile_disc(0.5).within_group(WorkflowLog.execution_time_ms),
+            func.percentile_disc(0.95).within_group(WorkflowLog.execution_time_ms)
+        ).filter(*in_bucket).group_by(WorkflowLog.area_id).all()
+        return [
+            {'area_id': row[0], 'count': row[1], 'success_count': row[2], 'failed_count': row[3],
+             'error_count': row[4], 'p50_execution_time_ms': row[5], 'p95_execution_time_ms': row[6]}
+            for row in rows
+        ]
+
+    # Other databases have no percentile aggregate: compute it from the bucket's rows
+    areas = {}
+    for area_id, status, execution_time_ms in db.session.query(
+        WorkflowLog.area_id, WorkflowLog.status, WorkflowLog.execution_time_ms
+    ).filter(*in_bucket):
+        area = areas.setdefault(area_id, {'area_id': area_id, 'count': 0, 'success_count': 0,
+                                          'failed_count': 0, 'error_count': 0, 'times': []})
+        area['count'] += 1
+        if f'{status}_count' in area:
+            area[f'{status}_count'] += 1
+        if execution_time_ms is not None:
+            area['times'].append(execution_time_ms)
+
+    for area in areas.values():
+        times = sorted(area.pop('times'))
+        area['p50_execution_time_ms'] = _percentile(times, 0.5)
+        area['p95_execution_time_ms'] = _percentile(times, 0.95)
+    return list(areas.values())
+
+
+def _upsert_rollups(granularity, bucket_start, rows):
+    """Insert a bucket's rollups, overwriting the ones already there
+
+    A bucket aggregated twice is replaced rather than added, so it is never
+    counted twice, and the unique constraint never fails.
+    """
+    if not rows:
+        return
+
+    insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+    statement = insert(WorkflowLogRollup).values([
+        dict(granularity=granularity, bucket_start=bucket_start, **values) for values in rows
+    ])
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['area_id', 'granularity', 'bucket_start'],
+        set_={column: statement.excluded[column] for column in AGGREGATE_COLUMNS}
+    ))
+
+
+def next_bucket(granularity):
+    """Start of the first bucket not rolled up yet (None when there are no logs at all)
+
+    Buckets are rolled up in order, so every log before this is aggregated.
+    """
+    last = db.session.query(func.max(WorkflowLogRollup.bucket_start)).filter(
+        WorkflowLogRollup.granularity == granularity
+    ).scalar()
+    if last is not None:
+        return last + BUCKETS[granularity]
+
+    first = db.session.query(func.min(WorkflowLog.triggered_at)).scalar()
+    return _floor(first, granularity) if first else None
+
+
+def roll_up(granularity) -> int:
+    """Aggregate the closed buckets of a granularity, one transaction per bucket
+
+    A bucket is closed WORKFLOW_LOG_ROLLUP_DELAY_MINUTES after it ends so that
+    logs written late (retried reactions keep their trigger time) are counted.
+    Buckets without logs are skipped. Returns the number of buckets rolled up.
+    """
+    size = BUCKETS[granularity]
+    closed_before = _floor(utcnow() - timedelta(minutes=Config.WORKFLOW_LOG_ROLLUP_DELAY_MINUTES), granularity)
+    start = next_bucket(granularity)
+    rolled = 0
+
+    while start is not None and start < closed_before and rolled < MAX_BUCKETS_PER_RUN[granularity]:
+        first = db.session.query(func.min(WorkflowLog.triggered_at)).filter(
+            WorkflowLog.triggered_at >= start,
+            WorkflowLog.triggered_at < closed_before
+        ).scalar()
+        if first is None:
+            break
+
+        start = _floor(first, granularity)
+        end = start + size
+
+        _upsert_rollups(granularity, start, _aggregate(start, end))
+        db.session.commit()
+
+        start = end
+        rolled += 1
+
+    return rolled
+
+
+def prune_rollups(batch_size=None) -> int:
+    """Delete rollups older than their granularity's retention, in bounded batches"""
+    batch_size = batch_size or Config.WORKFLOW_LOG_DELETE_BATCH_SIZE
+    retention_days = {
+        'hour': Config.WORKFLOW_LOG_HOURLY_ROLLUP_DAYS,
+        'day': Config.WORKFLOW_LOG_DAILY_ROLLUP_DAYS
+    }
+    deleted = 0
+
+    for granularity, days in retention_days.items():
+        deleted += delete_in_batches(
+            WorkflowLogRollup,
+            WorkflowLogRollup.granularity == granularity,
+            WorkflowLogRollup.bucket_start < utcnow() - timedelta(days=days),
+            batch_size=batch_size
+        )
+
+    return deleted
+
+
+def _rotation_cutoff():
+    """Retention cutoff of raw logs, held back to the first bucket a granularity has not rolled up"""
+    cutoff = _floor(utcnow() - timedelta(days=Config.WORKFLOW_LOG_RETENTION_DAYS), 'day')
+    for granularity in BUCKETS:
+        rolled_until = next_bucket(granularity)
+        if rolled_until is not None:
+            cutoff = min(cutoff, rolled_until)
+    return cutoff
+
+
+def compact_workflow_logs(app):
+    """Roll up closed log buckets, then drop expired raw logs and rollups (hourly job)
+
+    Runs on a single node at a time (advisory lock on PostgreSQL), the others
+    skip the run. Raw logs are only deleted once both granularities have
+    aggregated them, so a rollup that fails or falls behind delays deletion
+    instead of losing data.
+    """
+    with app.app_context(), try_advisory_lock(COMPACTION_LOCK_ID) as locked:
+        if not locked:
+            return  # Another node is compacting
+
+        try:
+            for granularity in BUCKETS:
+                roll_up(granularity)
+            prune_rollups()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Workflow log rollup error: {str(e)}")
+
+        try:
+            cutoff = _rotation_cutoff()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Workflow log rotation error: {str(e)}")
+            return
+
+        rotate_workflow_logs(app, cutoff=cutoff)
@@ -0,0 +1,141 @@
+import math
+import os
+import socket
+import threading
+import uuid
+from datetime import timedelta
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from database.models import db, UserArea, SchedulerNode, SchedulerShardLease
+from database.util import utcnow
+from config import Config
+
+# Identifies this scheduler process in scheduler_nodes and scheduler_shard_leases
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Sections of this node's stats published so far (see publish_stats)
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _lease_duration() -> timedelta:
+    return timedelta(seconds=Config.SCHEDULER_LEASE_SECONDS)
+
+
+def _heartbeat(now):
+    """Register this node as alive and forget nodes that stopped heartbeating"""
+    node = db.session.get(SchedulerNode, NODE_ID)
+    if node:
+        node.heartbeat_at = now
+    else:
+        db.session.add(SchedulerNode(node_id=NODE_ID, heartbeat_at=now))
+
+    SchedulerNode.query.filter(
+        SchedulerNode.heartbeat_at < now - 10 * _lease_duration()
+    ).delete(synchronize_session=False)
+
+
+def live_nodes(now=None):
+    """Query of the nodes that heartbeated within the lease duration"""
+    now = now or utcnow()
+    return SchedulerNode.query.filter(SchedulerNode.heartbeat_at >= now - _lease_duration())
+
+
+def _ensure_lease_rows():
+    """Create the lease rows of shards that do not have one yet"""
+    existing = {shard_id for (shard_id,) in db.session.query(SchedulerShardLease.shard_id)}
+    missing = [shard_id for shard_id in range(Config.SCHEDULER_SHARD_COUNT) if shard_id not in existing]
+    if not missing:
+        return
+
+    try:
+        db.session.add_all([SchedulerShardLease(shard_id=shard_id) for shard_id in missing])
+        db.session.commit()
+    except IntegrityError:
+        # Another node created them at the same time
+        db.session.rollback()
+
+
+def claim_shards() -> list:
+    """Renew this node's leases and rebalance shards across live nodes
+
+    Each node targets ceil(shards / live nodes) shards: it claims free or
+    expired leases up to that share and releases any surplus so that new
+    nodes can pick it up. Lease rows are locked with SELECT ... FOR UPDATE
+    SKIP LOCKED so concurrent nodes never claim the same shard.
+    """
+    now = utcnow()
+    _heartbeat(now)
+    db.session.commit()
+    _ensure_lease_rows()
+
+    node_count = live_nodes(now).count()
+    fair_share = math.ceil(Config.SCHEDULER_SHARD_COUNT / max(node_count, 1))
+
+    leases = SchedulerShardLease.query.filter(
+        SchedulerShardLease.shard_id < Config.SCHEDULER_SHARD_COUNT,
+        or_(
+            SchedulerShardLease.owner == NODE_ID,
+            SchedulerShardLease.expires_at.is_(None),
+            SchedulerShardLease.expires_at < now
+        )
+    ).order_by(SchedulerShardLease.shard_id).with_for_update(skip_locked=True).all()
+
+    owned = [lease for lease in leases if lease.owner == NODE_ID]
+    free = [lease for lease in leases if lease.owner != NODE_ID]
+
+    # Release surplus shards, claim free ones up to the fair share
+    surplus = [lease.shard_id for lease in owned[fair_share:]]
+    owned = [lease.shard_id for lease in owned[:fair_share]]
+    owned.extend(lease.shard_id for lease in free[:fair_share - len(owned)])
+
+    if surplus:
+        SchedulerShardLease.query.filter(SchedulerShardLease.shard_id.in_(surplus)).update(
+            {'owner': None, 'expires_at': None}, synchronize_session=False
+        )
+    if owned:
+        SchedulerShardLease.query.filter(SchedulerShardLease.shard_id.in_(owned)).update(
+            {'owner': NODE_ID, 'expires_at': now + _lease_duration()}, synchronize_session=False
+        )
+
+    db.session.commit()
+    return sorted(owned)
+
+
+def release_shards():
+    """Give back this node's leases and unregister it (called on shutdown)"""
+    SchedulerShardLease.query.filter_by(owner=NODE_ID).update(
+        {'owner': None, 'expires_at': None}, synchronize_session=False
+    )
+    SchedulerNode.query.filter_by(node_id=NODE_ID).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def publish_stats(section, values):
+    """Store this node's latest summary of a job on its scheduler_nodes row
+
+    /health reads them from there: it usually runs in a web process without
+    a scheduler. Sections published earlier by this node are kept.
+    """
+    with _stats_lock:
+        _stats[section] = values
+        SchedulerNode.query.filter_by(node_id=NODE_ID).update({'stats': dict(_stats)}, synchronize_session=False)
+        db.session.commit()
+
+
+def owned_shards() -> list:
+    """Return the shards this node currently holds a valid lease on (without renewing them)"""
+    leases = SchedulerShardLease.query.filter(
+        SchedulerShardLease.owner == NODE_ID,
+        SchedulerShardLease.expires_at >= utcnow()
+    ).with_entities(SchedulerShardLease.shard_id).all()
+    return sorted(shard_id for (shard_id,) in leases)
+
+
+def filter_owned_areas(query, shard_ids):
+    """Restrict a UserArea query to the shards owned by this node
+
+    Areas are sharded by owner so every area of a user is handled by the same
+    node, which keeps per-user fetch sharing within a tick.
+    """
+    return query.filter((UserArea.user_id % Config.SCHEDULER_SHARD_COUNT).in_(shard_ids))
@@ -0,0 +1,29 @@
+# GitHub actions whose events can be pushed by webhook
+GITHUB_PUSH_ACTIONS = {'new_star_on_repo', 'new_issue_created', 'new_pr_opened'}
+# Gmail actions woken up by mailbox change notifications
+GMAIL_PUSH_ACTIONS = {'email_received_from', 'email_subject_contains'}
+
+
+def github_source_key(repo_name):
+    """Key of a GitHub repository, e.g. "github:owner/repo" (repository names are case-insensitive)"""
+    return f"github:{repo_name.strip().lower()}"
+
+
+def source_key(action_name, action_config):
+    """Return the event source an area watches, used to route webhook events to it (None if not pushable)"""
+    if action_name in GITHUB_PUSH_ACTIONS:
+        repo_name = (action_config or {}).get('repo_name')
+        return github_source_key(repo_name) if repo_name else None
+    return None
+
+
+def update_source(area, action_name):
+    """Refresh area.source_key after its action or config changed
+
+    A different source may not push events: polling resumes at the normal
+    pace until a webhook is received for it.
+    """
+    key = source_key(action_name, area.action_config)
+    if key != area.source_key:
+        area.source_key = key
+        area.push_enabled = False
@@ -0,0 +1,181 @@
+import threading
+from datetime import datetime
+from utils.gmail_client import fetch_new_emails, fetch_email_metadata, fetch_added_message_ids, get_history_id
+from utils.drive_client import fetch_recent_files, fetch_changes, get_start_page_token, get_folder_id_by_name, FOLDER_MIME_TYPE
+from .polling import lookback_since
+
+# Most recent events kept in a connection's sync buffer
+SYNC_BUFFER_SIZE = 100
+
+# Drive folder ids by (user_id, folder name), dropped when the user's change feed touches a folder
+_drive_folder_ids = {}
+# Page token each user's feed was last synced to by this process
+_drive_synced_tokens = {}
+_drive_folder_ids_lock = threading.Lock()
+
+
+def _serialize_email(email) -> dict:
+    return {**email, 'timestamp': email['timestamp'].isoformat()}
+
+
+def _deserialize_email(email) -> dict:
+    return {**email, 'timestamp': datetime.fromisoformat(email['timestamp'])}
+
+
+def _store_buffer(connection, cursor, emails):
+    """Persist the cursor and the emails still inside the lookback window, newest first"""
+    since = lookback_since()
+    emails = sorted(
+        (email for email in emails if email['timestamp'] >= since),
+        key=lambda email: email['timestamp'],
+        reverse=True
+    )[:SYNC_BUFFER_SIZE]
+
+    connection.sync_cursor = str(cursor)
+    connection.sync_buffer = [_serialize_email(email) for email in emails]  # Reassigned so the change is tracked
+    return emails
+
+
+def _full_gmail_sync(connection, service) -> list:
+    """List the lookback window from scratch and start a new history cursor"""
+    # Cursor read before listing so messages arriving in between are caught by the next sync
+    cursor = get_history_id(service)
+    since_timestamp = int(lookback_since().timestamp())
+    emails = fetch_new_emails(service, since_timestamp=since_timestamp, max_results=SYNC_BUFFER_SIZE)
+    return _store_buffer(connection, cursor, emails)
+
+
+def sync_gmail_messages(connection, service) -> list:
+    """Return the recent emails of a Gmail connection, synced incrementally
+
+    The connection's historyId cursor is advanced with users.history.list so a
+    quiet mailbox costs a single small request; only added messages have their
+    metadata fetched. Emails are buffered on the connection for the lookback
+    window so every area of the user sees them, whenever it polls. Falls back
+    to a full list when there is no cursor yet or it has expired.
+    """
+    if not connection.sync_cursor or connection.sync_buffer is None:
+        return _full_gmail_sync(connection, service)
+
+    emails = [_deserialize_email(email) for email in connection.sync_buffer]
+
+    try:
+        history = fetch_added_message_ids(service, connection.sync_cursor)
+        if history is None:
+            return _full_gmail_sync(connection, service)
+
+        message_ids, cursor = history
+        known_ids = {email['id'] for email in emails}
+        new_ids = [message_id for message_id in message_ids if message_id not in known_ids]
+        if new_ids:
+            emails.extend(fetch_email_metadata(service, new_ids[-SYNC_BUFFER_SIZE:]))
+
+    except Exception as e:
+        # Keep the cursor: the same changes are read again on the next sync
+        print(f"Error syncing Gmail history: {str(e)}")
+        return emails
+
+    return _store_buffer(connection, cursor, emails)
+
+
+def file_created_at(file) -> datetime:
+    return datetime.fromisoformat(file['createdTime'].replace('Z', '+00:00'))
+
+
+def _store_drive_buffer(connection, page_token, files):
+    """Persist the page token and the files created inside the lookback window, newest first"""
+    since = lookback_since()
+    files = sorted(
+        (file for file in files if file.get('createdTime') and file_created_at(file) >= since),
+        key=file_created_at,
+        reverse=True
+    )[:SYNC_BUFFER_SIZE]
+
+    connection.sync_cursor = str(page_token)
+    connection.sync_buffer = files  # Reassigned so the change is tracked
+    return files
+
+
+def _invalidate_drive_folders(user_id):
+    with _drive_folder_ids_lock:
+        _drive_synced_tokens.pop(user_id, None)
+        for key in [key for key in _drive_folder_ids if key[0] == user_id]:
+            del _drive_folder_ids[key]
+
+
+def _full_drive_sync(connection, service) -> list:
+    """List the files created in the lookback window and start a new changes cursor"""
+    # Token read before listing so files created in between are caught by the next sync
+    page_token = get_start_page_token(service)
+    since_timestamp = int(lookback_since().timestamp())
+    files = fetch_recent_files(service, since_timestamp=since_timestamp, max_results=SYNC_BUFFER_SIZE)
+
+    _invalidate_drive_folders(connection.user_id)
+    with _drive_folder_ids_lock:
+        _drive_synced_tokens[connection.user_id] = page_token
+
+    return _store_drive_buffer(connection, page_token, files)
+
+
+def sync_drive_files(connection, service) -> list:
+    """Return the files recently created in a Drive connection, synced from the changes feed
+
+    One changes.list call per sync serves every Drive area of the user: files
+    are buffered on the connection for the lookback window and kept up to date
+    (moved, renamed, trashed) from the feed. Falls back to a full list when
+    there is no page token yet or it is no longer valid.
+    """
+    if not connection.sync_cursor or connection.sync_buffer is None:
+        return _full_drive_sync(connection, service)
+
+    files = {file['id']: file for file in connection.sync_buffer}
+
+    # The feed was advanced elsewhere (e.g. by another scheduler node): folder changes may have been missed
+    with _drive_folder_ids_lock:
+        synced_elsewhere = _drive_synced_tokens.get(connection.user_id) != connection.sync_cursor
+    if synced_elsewhere:
+        _invalidate_drive_folders(connection.user_id)
+
+    try:
+        result = fetch_changes(service, connection.sync_cursor)
+        if result is None:
+            return _full_drive_sync(connection, service)
+    except Exception as e:
+        # Keep the page token: the same changes are read again on the next sync
+        print(f"Error syncing Drive changes: {str(e)}")
+        return list(files.values())
+
+    changes, page_token = result
+    folders_changed = False
+    for change in changes:
+        file = change['file']
+        if change['removed']:
+            files.pop(change['file_id'], None)
+            folders_changed = True  # Removed items carry no type, it may have been a folder
+        else:
+            files[file['id']] = file
+            folders_changed = folders_changed or file['mimeType'] == FOLDER_MIME_TYPE
+
+    if folders_changed:
+        _invalidate_drive_folders(connection.user_id)
+
+    with _drive_folder_ids_lock:
+        _drive_synced_tokens[connection.user_id] = page_token
+
+    return _store_drive_buffer(connection, page_token, files.values())
+
+
+def resolve_drive_folder(user_id, service, folder_name):
+    """Return the id of a user's Drive folder by name, cached until the folder feed changes"""
+    key = (user_id, folder_name)
+    with _drive_folder_ids_lock:
+        if key in _drive_folder_ids:
+            return _drive_folder_ids[key]
+
+    folder_id = get_folder_id_by_name(service, folder_name)
+
+    # Misses are not cached: creating the folder later must be picked up
+    if folder_id:
+        with _drive_folder_ids_lock:
+            _drive_folder_ids[key] = folder_id
+    return folder_id
@@ -0,0 +1,116 @@
+from datetime import datetime, timezone, timedelta
+from zoneinfo import ZoneInfo
+from database.models import db, WorkflowLog
+from config import Config
+
+# Actions driven by UserArea.next_fire_at instead of being polled
+TIMER_ACTIONS = ('time_matches', 'interval_elapsed')
+
+
+def _utc(dt):
+    """Return dt as an aware UTC datetime (DB values are stored naive)"""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def _next_time_match(action_config, now):
+    """Next occurrence of action_config['time'] (HH:MM) strictly after now"""
+    config_time = action_config.get('time')
+    try:
+        hour, minute = (int(part) for part in config_time.split(':'))
+    except (AttributeError, ValueError, TypeError):
+        return None
+
+    # Get user's timezone from config, fallback to server default
+    user_timezone = action_config.get('timezone', Config.SCHEDULER_TIMEZONE)
+    try:
+        tz = ZoneInfo(user_timezone)
+    except Exception:
+        tz = ZoneInfo(Config.SCHEDULER_TIMEZONE)
+
+    local_now = now.astimezone(tz)
+    candidate = local_now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= local_now:
+        candidate = (local_now + timedelta(days=1)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+    return candidate.astimezone(timezone.utc)
+
+
+def _next_interval(action_config, last_triggered, now):
+    """last_triggered + interval_minutes, or now if the area never triggered"""
+    try:
+        interval_minutes = int(action_config.get('interval_minutes'))
+    except (ValueError, TypeError):
+        return None
+
+    if interval_minutes <= 0:
+        return None
+
+    # If never triggered, trigger now
+    if not last_triggered:
+        return now
+
+    return _utc(last_triggered) + timedelta(minutes=interval_minutes)
+
+
+def compute_next_fire_at(action_name, action_config, last_triggered=None, now=None):
+    """Return when a timer action fires next (naive UTC), or None if not a timer/invalid config"""
+    now = _utc(now) or datetime.now(timezone.utc)
+    action_config = action_config or {}
+
+    if action_name == 'time_matches':
+        next_fire_at = _next_time_match(action_config, now)
+    elif action_name == 'interval_elapsed':
+        next_fire_at = _next_interval(action_config, last_triggered, now)
+    else:
+        return None
+
+    return next_fire_at.replace(tzinfo=None) if next_fire_at else None
+
+
+def schedule_area(area, action_name, now=None):
+    """Recompute area.next_fire_at (on creation, config edit and after each trigger)"""
+    area.next_fire_at = compute_next_fire_at(action_name, area.action_config, area.last_triggered, now)
+
+
+def _disable_invalid_area(area, action_name, now):
+    """Deactivate a timer area whose config cannot be scheduled (committed by the caller)
+
+    Its next_fire_at would stay NULL and the area would be loaded again every
+    tick, so it is switched off once with an error in its logs instead.
+    """
+    print(f"Warning: Area {area.id} has an invalid {action_name} config, deactivating it")
+    area.is_active = False
+    db.session.add(WorkflowLog(
+        area_id=area.id,
+        status='error',
+        message=f'Invalid {action_name} configuration, workflow deactivated',
+        triggered_at=now,
+        execution_time_ms=0
+    ))
+
+
+def is_due(area, action_name, now=None) -> bool:
+    """Check whether a timer area should fire now, based on its precomputed next_fire_at"""
+    now = _utc(now) or datetime.now(timezone.utc)
+
+    # Areas created before next_fire_at existed get scheduled on first sight
+    if area.next_fire_at is None:
+        schedule_area(area, action_name, now)
+        if area.next_fire_at is None:
+            _disable_invalid_area(area, action_name, now)
+            return False
+
+    next_fire_at = _utc(area.next_fire_at)
+    if next_fire_at > now:
+        return False
+
+    # A daily time that was missed by more than the grace period (e.g. scheduler down) waits for the next day
+    if action_name == 'time_matches' and now - next_fire_at > timedelta(minutes=Config.SCHEDULER_TIMER_GRACE_MINUTES):
+        schedule_area(area, action_name, now)
+        return False
+
+    return True
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import or_
+from database.models import db, UserServiceConnection, UserArea
+from database.catalog import get_service_id, get_action_ids
+from utils.gmail_client import create_gmail_service, get_email_address, watch_mailbox
+from config import Config
+from .sharding import owned_shards
+from .sources import GMAIL_PUSH_ACTIONS
+
+# Watches are renewed this long before they expire
+WATCH_RENEWAL_MARGIN = timedelta(days=1)
+
+
+def renew_gmail_watches(app) -> int:
+    """Create or renew the Gmail users.watch of the connections in this node's shards
+
+    Runs hourly when GMAIL_PUBSUB_TOPIC is set. A connection whose watch
+    cannot be renewed has its Gmail areas go back to regular polling.
+    """
+    if not Config.GMAIL_PUBSUB_TOPIC:
+        return 0
+
+    with app.app_context():
+        shard_ids = owned_shards()
+        if not shard_ids:
+            return 0
+
+        renew_before = (datetime.now(timezone.utc) + WATCH_RENEWAL_MARGIN).replace(tzinfo=None)
+        connections = UserServiceConnection.query.filter(
+            UserServiceConnection.service_id == get_service_id('gmail'),
+            (UserServiceConnection.user_id % Config.SCHEDULER_SHARD_COUNT).in_(shard_ids),
+            or_(
+                UserServiceConnection.watch_expires_at.is_(None),
+                UserServiceConnection.watch_expires_at < renew_before
+            )
+        ).all()
+
+        renewed = 0
+        for connection in connections:
+            try:
+                gmail_api = create_gmail_service(connection.access_token, connection.refresh_token, connection.token_expires_at)
+                if not gmail_api:
+                    raise RuntimeError('Failed to create Gmail service')
+
+                # Notifications only carry the address, connections made before it was stored need it
+                if not connection.account_email:
+                    connection.account_email = get_email_address(gmail_api).lower()
+
+                expires_at = watch_mailbox(gmail_api, Config.GMAIL_PUBSUB_TOPIC)
+                connection.watch_expires_at = expires_at.replace(tzinfo=None)
+                renewed += 1
+
+            except Exception as e:
+                print(f"Gmail watch error for user {connection.user_id}: {str(e)}")
+                connection.watch_expires_at = None
+                UserArea.query.filter(
+                    UserArea.user_id == connection.user_id,
+                    UserArea.action_id.in_(get_action_ids(GMAIL_PUSH_ACTIONS))
+                ).update({'push_enabled': False}, synchronize_session=False)
+
+            db.session.commit()
+
+        if renewed:
+            print(f"Gmail: renewed {renewed} mailbox watches")
+        return renewed
@@ -1,4 +1,5 @@
 from database.models import db, Service, Action, Reaction, User
+from database.catalog import invalidate_catalog
 from utils.auth_utils import hash_password
 
 # ANSI color codes for terminal output
@@ -133,6 +134,12 @@ def seed_email_service():
                     'type': 'string',
                     'maxLength': 5000,
                     'description': 'Email body content'
+                },
+                'digest_minutes': {
+                    'type': 'integer',
+                    'minimum': 0,
+                    'maximum': 1440,
+                    'description': 'Group emails to this recipient into one digest sent every N minutes (0 = send each email immediately)'
                 }
             },
             'required': ['to', 'subject', 'body']
@@ -745,6 +752,7 @@ def seed_all():
     seed_spotify_service()
 
     db.session.commit()
+    invalidate_catalog()
 
     print(f"\n{GREEN}=== Seeding completed successfully ==={RESET}")
     print(f"{CYAN}Total services: {Service.query.count()}{RESET}")
@@ -0,0 +1,92 @@
+import os
+import tempfile
+
+# The app reads its configuration on import: point it at a throwaway SQLite database
+_database_dir = tempfile.mkdtemp(prefix='area-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_database_dir, 'area.db')}"
+os.environ['JWT_SECRET_KEY'] = 'test-secret'
+os.environ['SCHEDULER_ENABLED'] = 'false'
+os.environ['GITHUB_WEBHOOK_SECRET'] = 'test-webhook-secret'
+os.environ['GMAIL_PUSH_TOKEN'] = 'test-push-token'
+
+import pytest
+from sqlalchemy import create_engine
+from app import app as flask_app
+from database.models import db, User, Action, Reaction
+from database.routing import REPLICA_BIND
+from scheduler.metrics import StatementCounter, install_statement_counter, track_statements
+from seed_data import seed_all
+from utils.auth_utils import generate_token
+
+
+@pytest.fixture
+def app(capsys):
+    """The Flask app on a freshly created and seeded database"""
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.create_all()
+        seed_all()
+        capsys.readouterr()  # Drop the seeding output
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username='alice', email='alice@example.com', password_hash='not-used')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {'Authorization': f'Bearer {generate_token(user.id)}'}
+
+
+@pytest.fixture
+def create_area(client, auth_headers):
+    """Create a workflow through the API, from action and reaction names"""
+    def create(action_name, reaction_name, action_config, reaction_config, name='Workflow'):
+        response = client.post('/api/areas', headers=auth_headers, json={
+            'name': name,
+            'action_id': Action.query.filter_by(name=action_name).one().id,
+            'reaction_id': Reaction.query.filter_by(name=reaction_name).one().id,
+            'action_config': action_config,
+            'reaction_config': reaction_config
+        })
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['area']
+
+    return create
+
+
+@pytest.fixture
+def count_statements(app):
+    """Number of SQL statements a request issues, starting from an empty session like a real request"""
+    def count(request):
+        install_statement_counter(db.engines.values())
+        db.session.remove()
+        with track_statements(StatementCounter()) as statements:
+            response = request()
+        return response, statements.count
+
+    return count
+
+
+@pytest.fixture
+def replica(app):
+    """A second database registered as the replica bind, with the schema but none of the primary's rows"""
+    path = os.path.join(tempfile.mkdtemp(prefix='area-replica-'), 'replica.db')
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    db.engines[REPLICA_BIND] = engine
+    yield engine
+    del db.engines[REPLICA_BIND]
+    engine.dispose()
@@ -0,0 +1,40 @@
+from database.models import db, User, UserArea, Action, Reaction
+from utils.auth_utils import generate_token
+
+LISTINGS = ('/api/admin/users', '/api/admin/users?cursor=&per_page=50')
+
+
+def _add_users(count):
+    """Users with one workflow per action, so per-user or per-workflow lookups would show up as extra statements"""
+    reaction_id = Reaction.query.filter_by(name='send_email').one().id
+    action_ids = [action.id for action in Action.query.order_by(Action.id).limit(3)]
+    for index in range(User.query.count(), User.query.count() + count):
+        user = User(username=f'user{index}', email=f'user{index}@example.com', password_hash='not-used')
+        db.session.add(user)
+        db.session.flush()
+        for action_id in action_ids:
+            db.session.add(UserArea(
+                user_id=user.id, name=f'Workflow {action_id}', action_id=action_id, reaction_id=reaction_id,
+                action_config={}, reaction_config={}
+            ))
+    db.session.commit()
+
+
+def test_admin_users_listing_issues_a_constant_number_of_statements(app, client, count_statements):
+    admin_headers = {'Authorization': f'Bearer {generate_token(1)}'}  # The seeded admin
+    _add_users(1)
+    client.get('/api/admin/users', headers=admin_headers)  # Warm the catalog cache
+
+    few_users = {}
+    for path in LISTINGS:
+        response, few_users[path] = count_statements(lambda: client.get(path, headers=admin_headers))
+        assert response.status_code == 200
+        assert len(response.get_json()['users']) == 2
+
+    _add_users(10)
+    for path in LISTINGS:
+        response, many_users = count_statements(lambda: client.get(path, headers=admin_headers))
+        assert response.status_code == 200
+        assert len(response.get_json()['users']) == 12
+        assert all(len(user['workflows']) == (0 if user['id'] == 1 else 3) for user in response.get_json()['users'])
+        assert many_users == few_users[path]
@@ -0,0 +1,76 @@
+from database.models import Action, Reaction
+
+EMAIL_REACTION_CONFIG = {'to': 'alice@example.com', 'subject': 'Triggered', 'body': 'Hello'}
+
+
+def test_list_areas_issues_a_constant_number_of_statements(client, auth_headers, create_area, count_statements):
+    create_area('interval_elapsed', 'send_email', {'interval_minutes': 5}, EMAIL_REACTION_CONFIG)
+    client.get('/api/areas', headers=auth_headers)  # Warm the catalog cache
+
+    # Cursor mode: no COUNT query whatever the number of areas
+    response, one_area = count_statements(lambda: client.get('/api/areas?cursor=&per_page=50', headers=auth_headers))
+    assert response.status_code == 200
+    assert len(response.get_json()['areas']) == 1
+
+    # Every other action and reaction, so per-area lookups of them would show up as extra statements
+    actions = [action.name for action in Action.query.filter(Action.name != 'interval_elapsed')]
+    reactions = [reaction.name for reaction in Reaction.query.order_by(Reaction.id)]
+    for index, action_name in enumerate(actions):
+        create_area(action_name, reactions[index % len(reactions)], {}, {}, name=f'Workflow {index}')
+
+    response, many_areas = count_statements(lambda: client.get('/api/areas?cursor=&per_page=50', headers=auth_headers))
+    assert response.status_code == 200
+    assert len(response.get_json()['areas']) == len(actions) + 1
+    assert many_areas == one_area
+
+
+def test_list_areas_serializes_action_and_reaction(client, auth_headers, create_area):
+    create_area('interval_elapsed', 'send_email', {'interval_minutes': 5}, EMAIL_REACTION_CONFIG)
+
+    area = client.get('/api/areas', headers=auth_headers).get_json()['areas'][0]
+    assert area['action']['name'] == 'interval_elapsed'
+    assert area['action']['service'] == 'Timer'
+    assert area['reaction']['name'] == 'send_email'
+
+
+def test_create_area_issues_a_constant_number_of_statements(client, auth_headers, create_area, count_statements):
+    create_area('interval_elapsed', 'send_email', {'interval_minutes': 5}, EMAIL_REACTION_CONFIG)  # Warm the catalog cache
+    action_id = Action.query.filter_by(name='interval_elapsed').one().id
+    reaction_id = Reaction.query.filter_by(name='send_email').one().id
+
+    def create(name):
+        return lambda: client.post('/api/areas', headers=auth_headers, json={
+            'name': name,
+            'action_id': action_id,
+            'reaction_id': reaction_id,
+            'action_config': {'interval_minutes': 5},
+            'reaction_config': EMAIL_REACTION_CONFIG
+        })
+
+    response, second_area = count_statements(create('Second'))
+    assert response.status_code == 201
+    for index in range(10):
+        create_area('interval_elapsed', 'send_email', {'interval_minutes': 5}, EMAIL_REACTION_CONFIG, name=f'Workflow {index}')
+
+    response, twelfth_area = count_statements(create('Twelfth'))
+    assert response.status_code == 201
+    assert twelfth_area == second_area
+
+
+def test_updates_load_the_action_with_the_area(client, auth_headers, create_area, count_statements):
+    area_id = create_area('interval_elapsed', 'send_email', {'interval_minutes': 5}, EMAIL_REACTION_CONFIG)['id']
+
+    # Rescheduling reads the action's name: it must come with the area, not from a lazy load
+    for method, path, rescheduling in (
+        (client.put, f'/api/areas/{area_id}', {'action_config': {'interval_minutes': 10}}),
+        (client.patch, f'/api/areas/{area_id}', {'is_active': False}),
+    ):
+        response, renaming = count_statements(lambda: method(path, headers=auth_headers, json={'name': 'Renamed'}))
+        assert response.status_code == 200
+        response, rescheduled = count_statements(lambda: method(path, headers=auth_headers, json=rescheduling))
+        assert response.status_code == 200
+        assert rescheduled == renaming
+
+    response, toggled = count_statements(lambda: client.patch(f'/api/areas/{area_id}/toggle', headers=auth_headers))
+    assert response.status_code == 200
+    assert toggled == renaming
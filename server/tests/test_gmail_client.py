@@ -0,0 +1,51 @@
+import base64
+from utils.gmail_client import get_email_body, extract_message_body
+
+
+def _encoded(text):
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
+
+
+class FakeGmailService:
+    """Answers users().messages().get(...).execute() with a fixed message and records the requests"""
+
+    def __init__(self, message):
+        self.message = message
+        self.requests = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def get(self, **kwargs):
+        self.requests.append(kwargs)
+        return self
+
+    def execute(self):
+        return self.message
+
+
+def test_extracts_the_plain_text_part_of_a_nested_multipart_email():
+    payload = {
+        'mimeType': 'multipart/mixed',
+        'body': {'size': 0},
+        'parts': [{
+            'mimeType': 'multipart/alternative',
+            'body': {'size': 0},
+            'parts': [
+                {'mimeType': 'text/html', 'body': {'data': _encoded('<p>Hello</p>')}},
+                {'mimeType': 'text/plain', 'body': {'data': _encoded('Hello')}},
+            ],
+        }],
+    }
+
+    assert extract_message_body(payload) == 'Hello'
+
+
+def test_body_is_fetched_for_one_message_only():
+    service = FakeGmailService({'payload': {'mimeType': 'text/plain', 'body': {'data': _encoded('Quoted text')}}})
+
+    assert get_email_body(service, 'message-1') == 'Quoted text'
+    assert service.requests == [{'userId': 'me', 'id': 'message-1', 'format': 'full', 'fields': 'payload'}]
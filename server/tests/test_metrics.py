@@ -0,0 +1,43 @@
+import threading
+from sqlalchemy import text
+from database.models import db
+from scheduler.metrics import StatementCounter, install_statement_counter, track_statements
+
+
+def _select_one(engine):
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+
+
+def _in_thread(target):
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+
+
+def test_counts_the_statements_of_the_tick_on_every_engine(app, replica):
+    install_statement_counter(db.engines.values())
+
+    with track_statements(StatementCounter()) as tick:
+        _select_one(db.engine)
+        _select_one(replica)
+
+    assert tick.count == 2
+
+
+def test_counts_workers_of_the_tick_but_not_other_threads(app):
+    install_statement_counter(db.engines.values())
+    engine = db.engine
+    tick = StatementCounter()
+
+    def worker():
+        with track_statements(tick):
+            _select_one(engine)
+
+    with track_statements(tick):
+        _in_thread(worker)
+        _in_thread(lambda: _select_one(engine))  # e.g. a web request or the reaction queue
+        with track_statements(StatementCounter()):
+            _select_one(engine)  # Another counter (a request counted by a test) is kept apart
+
+    assert tick.count == 1
@@ -0,0 +1,99 @@
+import smtplib
+import pytest
+import requests
+from config import Config
+from database.models import db, ReactionJob, UserArea, WorkflowLog
+from scheduler import reaction_queue
+from scheduler.reaction_queue import claim_jobs, enqueue_reaction, run_job
+from utils.email_sender import _is_transient
+from utils.http_client import is_retryable
+
+EMAIL_REACTION_CONFIG = {'to': 'alice@example.com', 'subject': 'Tick', 'body': 'Interval elapsed'}
+
+
+def _http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError(response=response)
+
+
+@pytest.fixture
+def queued_job(app, create_area):
+    """A workflow whose reaction is queued and claimed by this node"""
+    area = db.session.get(UserArea, create_area('interval_elapsed', 'send_email', {'interval_minutes': 5}, EMAIL_REACTION_CONFIG)['id'])
+    enqueue_reaction(area, area.action, 'Interval elapsed', event_id=None)
+    db.session.commit()
+
+    def claim():
+        job_ids = claim_jobs(limit=1)
+        assert len(job_ids) == 1
+        return job_ids[0]
+
+    return area, claim
+
+
+def _logs(area):
+    return [(log.status, log.message) for log in WorkflowLog.query.filter_by(area_id=area.id).order_by(WorkflowLog.id)]
+
+
+def test_errors_are_classified():
+    assert is_retryable(requests.exceptions.ConnectTimeout())
+    assert is_retryable(requests.exceptions.ConnectionError())
+    assert is_retryable(_http_error(429))
+    assert is_retryable(_http_error(503))
+    assert not is_retryable(_http_error(404))
+    assert not is_retryable(ValueError('bad config'))
+
+    assert _is_transient(smtplib.SMTPServerDisconnected())
+    assert _is_transient(smtplib.SMTPResponseException(421, b'Try again later'))
+    assert _is_transient(TimeoutError())
+    assert not _is_transient(smtplib.SMTPResponseException(550, b'Mailbox unavailable'))
+    assert not _is_transient(smtplib.SMTPRecipientsRefused({}))
+
+
+def test_permanent_failure_is_dead_lettered_on_first_attempt(app, queued_job, monkeypatch):
+    area, claim = queued_job
+    monkeypatch.setattr(Config, 'SMTP_USERNAME', None)  # send_email fails on missing credentials
+
+    assert run_job(app, claim()) == 'dead'
+
+    job = ReactionJob.query.one()
+    assert (job.status, job.attempts) == ('dead', 1)
+    [(status, message)] = _logs(area)
+    assert status == 'failed'
+    assert 'SMTP' in message
+
+
+def test_transient_failure_is_logged_and_retried(app, queued_job, monkeypatch):
+    area, claim = queued_job
+    monkeypatch.setattr(Config, 'REACTION_JOB_MAX_ATTEMPTS', 2)
+    monkeypatch.setattr(Config, 'REACTION_JOB_BACKOFF_SECONDS', 0)
+    monkeypatch.setattr(reaction_queue, 'execute_reaction', lambda area: {
+        'success': False, 'error': 'SMTP error: 421 Try again later', 'retryable': True
+    })
+
+    assert run_job(app, claim()) == 'retried'
+    assert ReactionJob.query.one().status == 'pending'
+    assert [status for status, _ in _logs(area)] == ['error']
+
+    assert run_job(app, claim()) == 'dead'
+    assert ReactionJob.query.one().status == 'dead'
+    assert [status for status, _ in _logs(area)] == ['error', 'failed']
+
+
+def test_unexpected_exception_is_classified(app, queued_job, monkeypatch):
+    area, claim = queued_job
+    monkeypatch.setattr(Config, 'REACTION_JOB_BACKOFF_SECONDS', 0)
+
+    def time_out(area):
+        raise requests.exceptions.ReadTimeout('read timed out')
+
+    monkeypatch.setattr(reaction_queue, 'execute_reaction', time_out)
+    assert run_job(app, claim()) == 'retried'
+
+    def crash(area):
+        raise KeyError('to')
+
+    monkeypatch.setattr(reaction_queue, 'execute_reaction', crash)
+    assert run_job(app, claim()) == 'dead'
+    assert [status for status, _ in _logs(area)] == ['error', 'failed']
@@ -0,0 +1,35 @@
+from database.util import utcnow
+from database.models import db, Action, Reaction, UserArea
+
+
+def test_reads_go_to_the_replica_but_the_user_is_looked_up_on_the_primary(client, auth_headers, user, create_area, replica):
+    create_area('interval_elapsed', 'send_email', {'interval_minutes': 5}, {'to': 'alice@example.com'}, name='On the primary')
+    now = utcnow()
+    with replica.begin() as connection:
+        connection.execute(UserArea.__table__.insert().values(
+            user_id=user.id,
+            name='On the replica',
+            action_id=Action.query.filter_by(name='interval_elapsed').one().id,
+            reaction_id=Reaction.query.filter_by(name='send_email').one().id,
+            action_config={'interval_minutes': 5},
+            reaction_config={'to': 'alice@example.com'},
+            is_active=True,
+            push_enabled=False,
+            created_at=now,
+            updated_at=now
+        ))
+
+    # alice is only on the primary: a user lookup on the replica would answer 401
+    db.session.remove()  # Start from an empty session like a real request, not with alice in the identity map
+    response = client.get('/api/areas', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert [area['name'] for area in response.get_json()['areas']] == ['On the replica']
+
+
+def test_writes_go_to_the_primary(client, auth_headers, create_area, replica):
+    area = create_area('interval_elapsed', 'send_email', {'interval_minutes': 5}, {'to': 'alice@example.com'})
+
+    with replica.connect() as connection:
+        assert connection.execute(UserArea.__table__.select()).fetchall() == []
+    assert db.session.get(UserArea, area['id']) is not None
@@ -0,0 +1,131 @@
+import hashlib
+import hmac
+import json
+from pathlib import Path
+import pytest
+from config import Config
+from database.models import db, UserArea, ReactionJob, ProcessedEvent
+
+PAYLOADS = Path(__file__).parent / 'payloads'
+EMAIL_REACTION_CONFIG = {'to': 'alice@example.com', 'subject': 'GitHub activity', 'body': 'Something happened'}
+
+
+def load_payload(name) -> bytes:
+    """A delivery body recorded from GitHub, sent as the raw bytes that get signed"""
+    return (PAYLOADS / f'{name}.json').read_bytes()
+
+
+def sign(body, secret=None) -> str:
+    digest = hmac.new((secret or Config.GITHUB_WEBHOOK_SECRET).encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return f'sha256={digest}'
+
+
+def deliver(client, event, body, signature=None, delivery='72d3162e-cc78-11e3-81ab-4c9367dc0958'):
+    headers = {
+        'X-GitHub-Event': event,
+        'X-GitHub-Delivery': delivery,
+        'Content-Type': 'application/json',
+    }
+    if signature is not False:
+        headers['X-Hub-Signature-256'] = signature or sign(body)
+    return client.post('/api/webhooks/github', data=body, headers=headers)
+
+
+@pytest.fixture
+def issue_area(create_area):
+    # Repository names are matched case-insensitively
+    return create_area('new_issue_created', 'send_email', {'repo_name': 'octo-org/hello-world'}, EMAIL_REACTION_CONFIG)
+
+
+@pytest.fixture
+def star_area(create_area):
+    return create_area('new_star_on_repo', 'send_email', {'repo_name': 'octo-org/Hello-World'}, EMAIL_REACTION_CONFIG)
+
+
+def test_rejects_an_invalid_signature(client, issue_area):
+    body = load_payload('github_issues_opened')
+
+    response = deliver(client, 'issues', body, signature=sign(body, secret='wrong-secret'))
+
+    assert response.status_code == 401
+    assert ReactionJob.query.count() == 0
+
+
+def test_rejects_a_missing_signature(client, issue_area):
+    response = deliver(client, 'issues', load_payload('github_issues_opened'), signature=False)
+
+    assert response.status_code == 401
+
+
+def test_rejects_a_body_altered_after_signing(client, issue_area):
+    body = load_payload('github_issues_opened')
+    signature = sign(body)
+
+    response = deliver(client, 'issues', body.replace(b'"number": 42', b'"number": 43'), signature=signature)
+
+    assert response.status_code == 401
+
+
+def test_queues_the_reaction_of_an_opened_issue(client, issue_area):
+    response = deliver(client, 'issues', load_payload('github_issues_opened'))
+
+    assert response.status_code == 200
+    assert response.get_json()['workflows'] == {'queued': 1, 'failed': 0, 'duplicate': 0}
+    job = ReactionJob.query.one()
+    assert job.area_id == issue_area['id']
+    assert job.trigger_message == 'Issue #42: Crash when the config file is empty'
+    assert db.session.get(UserArea, issue_area['id']).push_enabled
+
+
+def test_redelivery_is_handled_once(client, issue_area):
+    body = load_payload('github_issues_opened')
+
+    first = deliver(client, 'issues', body)
+    # "Redeliver" in the GitHub UI sends the same body under a new delivery id
+    second = deliver(client, 'issues', body, delivery='9a4b2e10-cc78-11e3-8d3a-1b2c3d4e5f60')
+
+    assert first.get_json()['workflows']['queued'] == 1
+    assert second.status_code == 200
+    assert second.get_json()['workflows'] == {'queued': 0, 'failed': 0, 'duplicate': 1}
+    assert ReactionJob.query.count() == 1
+    assert ProcessedEvent.query.filter_by(area_id=issue_area['id'], external_event_id='issue:42').count() == 1
+
+
+def test_queues_the_reaction_of_a_new_star(client, star_area, issue_area):
+    response = deliver(client, 'star', load_payload('github_star_created'))
+
+    assert response.get_json()['workflows']['queued'] == 1
+    job = ReactionJob.query.one()
+    assert job.area_id == star_area['id']
+    assert job.trigger_message == 'New star from hubot'
+
+
+def test_ignores_a_signed_delivery_missing_the_event_fields(client, issue_area):
+    payload = json.loads(load_payload('github_issues_opened'))
+    del payload['issue']
+    body = json.dumps(payload).encode('utf-8')
+
+    response = deliver(client, 'issues', body)
+
+    assert response.status_code == 200
+    assert response.get_json()['ignored'] is True
+    assert ReactionJob.query.count() == 0
+
+
+def test_ignores_events_of_other_repositories(client, issue_area):
+    payload = json.loads(load_payload('github_issues_opened'))
+    payload['repository']['full_name'] = 'octo-org/other'
+    body = json.dumps(payload).encode('utf-8')
+
+    response = deliver(client, 'issues', body)
+
+    assert response.get_json()['workflows'] == {'queued': 0, 'failed': 0, 'duplicate': 0}
+    assert ReactionJob.query.count() == 0
+
+
+def test_ping_switches_the_repository_areas_to_push(client, issue_area, star_area):
+    response = deliver(client, 'ping', load_payload('github_ping'))
+
+    assert response.status_code == 200
+    assert response.get_json() == {'message': 'pong', 'workflows': 2}
+    assert all(area.push_enabled for area in UserArea.query.all())
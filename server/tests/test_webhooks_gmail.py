@@ -0,0 +1,105 @@
+import base64
+import json
+import uuid
+from datetime import datetime, timezone
+import pytest
+from config import Config
+from database.catalog import get_service_id
+from database.models import db, UserArea, UserServiceConnection
+
+EMAIL_REACTION_CONFIG = {'to': 'alice@example.com', 'subject': 'New email', 'body': 'You got mail'}
+
+
+class PubSubPublisher:
+    """Stand-in for the Pub/Sub push subscription posting Gmail notifications to the webhook
+
+    Wraps a notification in the envelope Pub/Sub pushes: the JSON Gmail
+    publishes, base64-encoded in message.data, with message metadata.
+    """
+
+    def __init__(self, client, token=None):
+        self.client = client
+        self.token = token or Config.GMAIL_PUSH_TOKEN
+
+    def push(self, email_address, history_id):
+        data = json.dumps({'emailAddress': email_address, 'historyId': history_id}).encode('utf-8')
+        return self.push_data(base64.b64encode(data).decode('ascii'))
+
+    def push_data(self, data):
+        envelope = {
+            'message': {
+                'data': data,
+                'messageId': str(uuid.uuid4().int)[:16],
+                'publishTime': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            },
+            'subscription': 'projects/area-project/subscriptions/gmail-push',
+        }
+        return self.client.post(f'/api/webhooks/gmail?token={self.token}', json=envelope)
+
+
+@pytest.fixture
+def publisher(client):
+    return PubSubPublisher(client)
+
+
+@pytest.fixture
+def gmail_connection(user):
+    connection = UserServiceConnection(
+        user_id=user.id,
+        service_id=get_service_id('gmail'),
+        access_token='gmail-access-token',
+        account_email='alice@example.com',
+        sync_cursor='1000'
+    )
+    db.session.add(connection)
+    db.session.commit()
+    return connection
+
+
+@pytest.fixture
+def gmail_area(create_area, gmail_connection):
+    return create_area('email_received_from', 'send_email', {'sender': 'bob@example.com'}, EMAIL_REACTION_CONFIG)
+
+
+def test_rejects_a_wrong_token(client, gmail_area):
+    response = PubSubPublisher(client, token='wrong-token').push('alice@example.com', 1001)
+
+    assert response.status_code == 401
+
+
+def test_notification_makes_the_mailbox_areas_due(publisher, gmail_area, create_area):
+    timer_area = create_area('interval_elapsed', 'send_email', {'interval_minutes': 60}, EMAIL_REACTION_CONFIG)
+    before = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    # Addresses are matched case-insensitively
+    response = publisher.push('Alice@Example.com', 1001)
+
+    assert response.status_code == 200
+    assert response.get_json()['workflows'] == 1
+    db.session.expire_all()
+    area = db.session.get(UserArea, gmail_area['id'])
+    assert area.push_enabled
+    assert area.next_fire_at >= before
+    assert not db.session.get(UserArea, timer_area['id']).push_enabled
+
+
+def test_notification_already_synced_wakes_nothing(publisher, gmail_area):
+    response = publisher.push('alice@example.com', 1000)
+
+    assert response.status_code == 200
+    assert response.get_json()['workflows'] == 0
+
+
+def test_notification_for_an_unknown_mailbox_wakes_nothing(publisher, gmail_area):
+    response = publisher.push('carol@example.com', 5000)
+
+    assert response.status_code == 200
+    assert response.get_json()['workflows'] == 0
+
+
+def test_malformed_message_is_acknowledged(publisher, gmail_area):
+    # Pub/Sub redelivers until it gets a 2xx, so malformed messages are acknowledged and ignored
+    response = publisher.push_data(base64.b64encode(b'not json').decode('ascii'))
+
+    assert response.status_code == 200
+    assert response.get_json()['ignored'] is True
@@ -1,24 +1,20 @@
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from utils.google_client import get_google_service
+from utils.http_client import is_retryable
 from googleapiclient.http import MediaIoBaseUpload
 from datetime import datetime, timezone
 import io
 
+# File fields read by the scheduler
+FILE_FIELDS = 'id, name, mimeType, createdTime, modifiedTime, owners, webViewLink, parents, trashed'
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
 
-def create_drive_service(access_token, refresh_token=None):
+
+def create_drive_service(access_token, refresh_token=None, expiry=None):
     """Create Google Drive API service with user's OAuth token"""
     try:
-        credentials = Credentials(
-            token=access_token,
-            refresh_token=refresh_token,
-            token_uri='https://oauth2.googleapis.com/token',
-            client_id=None,  # Not needed for API calls
-            client_secret=None
-        )
-
-        service = build('drive', 'v3', credentials=credentials)
-        return service
+        # Reuses a cached service object (and its discovery document) for this token
+        return get_google_service('drive', 'v3', access_token, refresh_token, expiry)
     except Exception as e:
         print(f"Error creating Drive service: {str(e)}")
         return None
@@ -48,24 +44,14 @@ def fetch_recent_files(service, folder_id=None, since_timestamp=None, max_result
         results = service.files().list(
             q=query,
             pageSize=max_results,
-            fields='files(id, name, mimeType, createdTime, modifiedTime, owners, webViewLink)',
+            fields=f'files({FILE_FIELDS})',
             orderBy='createdTime desc'
         ).execute()
 
         files = results.get('files', [])
 
         # Format file data
-        formatted_files = []
-        for file in files:
-            formatted_files.append({
-                'id': file['id'],
-                'name': file['name'],
-                'mimeType': file['mimeType'],
-                'createdTime': file.get('createdTime'),
-                'modifiedTime': file.get('modifiedTime'),
-                'webViewLink': file.get('webViewLink', ''),
-                'owner': file['owners'][0]['displayName'] if file.get('owners') else 'Unknown'
-            })
+        formatted_files = [format_file(file) for file in files]
 
         return formatted_files
 
@@ -77,10 +63,69 @@ def fetch_recent_files(service, folder_id=None, since_timestamp=None, max_result
         return []
 
 
+def format_file(file):
+    """Build the file dict used by the scheduler from a Drive file resource"""
+    return {
+        'id': file['id'],
+        'name': file['name'],
+        'mimeType': file['mimeType'],
+        'createdTime': file.get('createdTime'),
+        'modifiedTime': file.get('modifiedTime'),
+        'webViewLink': file.get('webViewLink', ''),
+        'owner': file['owners'][0]['displayName'] if file.get('owners') else 'Unknown',
+        'parents': file.get('parents', [])
+    }
+
+
+def get_start_page_token(service):
+    """Return the current page token of the Drive changes feed"""
+    response = service.changes().getStartPageToken().execute()
+    return response['startPageToken']
+
+
+def fetch_changes(service, page_token, max_pages=5):
+    """List the changes of the user's Drive since page_token
+
+    Returns (changes, new_page_token), each change being {'file_id', 'removed',
+    'file'} with 'file' formatted like fetch_recent_files (None when removed
+    or trashed), or None when page_token is no longer valid or the backlog is
+    too long to catch up on and a full sync is needed.
+    """
+    changes = []
+
+    for _ in range(max_pages):
+        try:
+            response = service.changes().list(
+                pageToken=page_token,
+                spaces='drive',
+                pageSize=100,
+                fields=f'nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}))'
+            ).execute()
+        except HttpError as error:
+            if error.resp.status in (400, 404, 410):
+                return None  # Expired or invalid page token
+            raise
+
+        for change in response.get('changes', []):
+            file = change.get('file')
+            removed = change.get('removed', False) or not file or file.get('trashed', False)
+            changes.append({
+                'file_id': change['fileId'],
+                'removed': removed,
+                'file': None if removed else format_file(file)
+            })
+
+        if 'newStartPageToken' in response:
+            return changes, response['newStartPageToken']
+        page_token = response['nextPageToken']
+
+    return None
+
+
 def get_folder_id_by_name(service, folder_name):
     """Get folder ID by name"""
     try:
-        query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+        query = f"name='{folder_name}' and mimeType='{FOLDER_MIME_TYPE}' and trashed=false"
 
         results = service.files().list(
             q=query,
@@ -131,10 +176,10 @@ def create_file(service, file_name, content, mime_type='text/plain', folder_id=N
 
     except HttpError as error:
         print(f"Drive API error: {error}")
-        return {'success': False, 'error': str(error)}
+        return {'success': False, 'error': str(error), 'retryable': is_retryable(error)}
     except Exception as e:
         print(f"Error creating file: {str(e)}")
-        return {'success': False, 'error': str(e)}
+        return {'success': False, 'error': str(e), 'retryable': is_retryable(e)}
 
 
 def create_folder(service, folder_name, parent_folder_id=None):
@@ -142,7 +187,7 @@ def create_folder(service, folder_name, parent_folder_id=None):
     try:
         file_metadata = {
             'name': folder_name,
-            'mimeType': 'application/vnd.google-apps.folder'
+            'mimeType': FOLDER_MIME_TYPE
         }
 
         if parent_folder_id:
@@ -162,10 +207,10 @@ def create_folder(service, folder_name, parent_folder_id=None):
 
     except HttpError as error:
         print(f"Drive API error: {error}")
-        return {'success': False, 'error': str(error)}
+        return {'success': False, 'error': str(error), 'retryable': is_retryable(error)}
     except Exception as e:
         print(f"Error creating folder: {str(e)}")
-        return {'success': False, 'error': str(e)}
+        return {'success': False, 'error': str(e), 'retryable': is_retryable(e)}
 
 
 def share_file(service, file_id, email_address, role='reader'):
@@ -191,7 +236,7 @@ def share_file(service, file_id, email_address, role='reader'):
 
     except HttpError as error:
         print(f"Drive API error: {error}")
-        return {'success': False, 'error': str(error)}
+        return {'success': False, 'error': str(error), 'retryable': is_retryable(error)}
     except Exception as e:
         print(f"Error sharing file: {str(e)}")
-        return {'success': False, 'error': str(e)}
+        return {'success': False, 'error': str(e), 'retryable': is_retryable(e)}
@@ -2,17 +2,53 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from config import Config
+from utils import smtp_pool
+
+
+def build_message(to: str, subject: str, body: str, html: bool = False) -> MIMEMultipart:
+    """Build the MIME message sent from the configured sender address."""
+    message = MIMEMultipart('alternative') # Alternative basically removes the html for older emails
+    message['From'] = Config.SMTP_FROM_EMAIL or Config.SMTP_USERNAME
+    message['To'] = to
+    message['Subject'] = subject
+
+    # Attach body as plain text or HTML
+    if html:
+        message.attach(MIMEText(body, 'html'))
+    else:
+        message.attach(MIMEText(body, 'plain'))
+    return message
+
+
+def smtp_configured() -> bool:
+    """Whether SMTP_USERNAME and SMTP_PASSWORD are set"""
+    return bool(Config.SMTP_USERNAME and Config.SMTP_PASSWORD)
+
+
+def missing_credentials_result() -> dict:
+    """Reaction result returned when no email can be sent for lack of SMTP credentials"""
+    return {
+        'success': False,
+        'message': 'Email sending failed',
+        'error': 'SMTP credentials not configured (missing SMTP_USERNAME or SMTP_PASSWORD)'
+    }
+
+
+def _is_transient(error) -> bool:
+    """SMTP failures worth retrying: dropped connections, timeouts and 4xx replies"""
+    if isinstance(error, (smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    # Socket timeouts and refused connections; SMTPException is an OSError too but is not transient by itself
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
 
 
 def send_email(to: str, subject: str, body: str, html: bool = False) -> dict:
     """Send an email via SMTP using configured credentials."""
     # Validate configuration
-    if not Config.SMTP_USERNAME or not Config.SMTP_PASSWORD:
-        return {
-            'success': False,
-            'message': 'Email sending failed',
-            'error': 'SMTP credentials not configured (missing SMTP_USERNAME or SMTP_PASSWORD)'
-        }
+    if not smtp_configured():
+        return missing_credentials_result()
 
     if not to:
         return {
@@ -22,29 +58,8 @@ def send_email(to: str, subject: str, body: str, html: bool = False) -> dict:
         }
 
     try:
-        # Create message
-        message = MIMEMultipart('alternative') # Alternative basically removes the html for older emails
-        message['From'] = Config.SMTP_FROM_EMAIL or Config.SMTP_USERNAME
-        message['To'] = to
-        message['Subject'] = subject
-
-        # Attach body as plain text or HTML
-        if html:
-            message.attach(MIMEText(body, 'html'))
-        else:
-            message.attach(MIMEText(body, 'plain'))
-
-        # Connect to SMTP server
-        with smtplib.SMTP(Config.SMTP_HOST, Config.SMTP_PORT, timeout=10) as server:
-            # Start TLS encryption
-            if Config.SMTP_USE_TLS:
-                server.starttls()
-
-            # Login to SMTP server
-            server.login(Config.SMTP_USERNAME, Config.SMTP_PASSWORD)
-
-            # Send email
-            server.send_message(message)
+        # Send over a pooled, already authenticated connection
+        smtp_pool.send_message(build_message(to, subject, body, html=html))
 
         return {
             'success': True,
@@ -62,21 +77,24 @@ def send_email(to: str, subject: str, body: str, html: bool = False) -> dict:
         return {
             'success': False,
             'message': 'Email sending failed',
-            'error': f'Failed to connect to SMTP server: {str(e)} (check SMTP_HOST and SMTP_PORT)'
+            'error': f'Failed to connect to SMTP server: {str(e)} (check SMTP_HOST and SMTP_PORT)',
+            'retryable': True
         }
 
     except smtplib.SMTPException as e:
         return {
             'success': False,
             'message': 'Email sending failed',
-            'error': f'SMTP error: {str(e)}'
+            'error': f'SMTP error: {str(e)}',
+            'retryable': _is_transient(e)
         }
 
     except Exception as e:
         return {
             'success': False,
             'message': 'Email sending failed',
-            'error': f'Unexpected error: {str(e)}'
+            'error': f'Unexpected error: {str(e)}',
+            'retryable': _is_transient(e)
         }
 
 
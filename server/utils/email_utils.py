@@ -1,7 +1,7 @@
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from config import Config
+from utils import smtp_pool
 
 
 def send_email(to_email, subject, html_body):
@@ -17,19 +17,8 @@ def send_email(to_email, subject, html_body):
         html_part = MIMEText(html_body, 'html')
         msg.attach(html_part)
 
-        # Connect to SMTP server
-        if Config.SMTP_USE_TLS:
-            server = smtplib.SMTP(Config.SMTP_HOST, Config.SMTP_PORT)
-            server.starttls()
-        else:
-            server = smtplib.SMTP(Config.SMTP_HOST, Config.SMTP_PORT)
-
-        # Login and send
-        if Config.SMTP_USERNAME and Config.SMTP_PASSWORD:
-            server.login(Config.SMTP_USERNAME, Config.SMTP_PASSWORD)
-
-        server.send_message(msg)
-        server.quit()
+        # Send over a pooled connection (shared with workflow emails)
+        smtp_pool.send_message(msg)
 
         return True
     except Exception as e:
@@ -1,4 +1,5 @@
 import requests
+from utils import http_client
 from datetime import datetime, timezone
 
 
@@ -16,7 +17,7 @@ def fetch_user_posts(access_token, since_timestamp=None, limit=10):
         if since_timestamp:
             params['since'] = int(since_timestamp)
 
-        response = requests.get(url, params=params)
+        response = http_client.get(url, params=params)
         response.raise_for_status()
 
         data = response.json()
@@ -66,7 +67,7 @@ def create_post(access_token, message):
             'message': message
         }
 
-        response = requests.post(url, data=data)
+        response = http_client.post(url, data=data)
         response.raise_for_status()
 
         result = response.json()
@@ -80,7 +81,8 @@ def create_post(access_token, message):
         print(f"Error creating Facebook post: {str(e)}")
         return {
             'success': False,
-            'error': str(e)
+            'error': str(e),
+            'retryable': http_client.is_retryable(e)
         }
     except Exception as e:
         print(f"Error processing Facebook post creation: {str(e)}")
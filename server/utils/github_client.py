@@ -1,6 +1,77 @@
+import threading
+from collections import OrderedDict
 import requests
+from utils import http_client
+from utils.rate_limits import token_key, record_budget
+from config import Config
 from datetime import datetime, timezone
 
+# Validators and parsed bodies of GitHub GET responses by (token hash, url, params, accept), least recently used first
+_conditional_cache = OrderedDict()
+_conditional_cache_lock = threading.Lock()
+
+
+def record_rate_limit(access_token, response):
+    """Feed the token's rate limit budget from the X-RateLimit-* response headers"""
+    headers = response.headers
+    if headers.get('X-RateLimit-Resource', 'core') != 'core' or 'X-RateLimit-Remaining' not in headers:
+        return
+
+    try:
+        record_budget(
+            'github',
+            access_token,
+            limit=int(headers.get('X-RateLimit-Limit', 5000)),
+            remaining=int(headers['X-RateLimit-Remaining']),
+            reset_at=datetime.fromtimestamp(int(headers['X-RateLimit-Reset']), tz=timezone.utc)
+        )
+    except (KeyError, ValueError):
+        pass
+
+
+def conditional_get(access_token, url, headers, params):
+    """GET a GitHub resource and return its parsed JSON, revalidating the cached copy
+
+    Sends If-None-Match / If-Modified-Since from the previous response for the
+    same token and URL; on 304 Not Modified (which GitHub does not count
+    against the rate limit) the cached body is returned. Errors raise like
+    raise_for_status().
+    """
+    key = (token_key(access_token), url, tuple(sorted(params.items())), headers.get('Accept'))
+
+    with _conditional_cache_lock:
+        cached = _conditional_cache.get(key)
+
+    request_headers = dict(headers)
+    if cached:
+        if cached['etag']:
+            request_headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            request_headers['If-Modified-Since'] = cached['last_modified']
+
+    response = http_client.get(url, headers=request_headers, params=params)
+    record_rate_limit(access_token, response)
+
+    if response.status_code == 304 and cached:
+        with _conditional_cache_lock:
+            if key in _conditional_cache:
+                _conditional_cache.move_to_end(key)
+        return cached['body']
+
+    response.raise_for_status()
+    body = response.json()
+
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if etag or last_modified:
+        with _conditional_cache_lock:
+            _conditional_cache[key] = {'etag': etag, 'last_modified': last_modified, 'body': body}
+            _conditional_cache.move_to_end(key)
+            while len(_conditional_cache) > Config.GITHUB_CONDITIONAL_CACHE_SIZE:
+                _conditional_cache.popitem(last=False)
+
+    return body
+
 
 def fetch_repo_stargazers(access_token, repo_name, since_timestamp=None, limit=10):
     """Fetch recent stargazers (people who liked the repo) for a repository"""
@@ -16,10 +87,8 @@ def fetch_repo_stargazers(access_token, repo_name, since_timestamp=None, limit=1
             'per_page': limit
         }
 
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-
-        stargazers = response.json()
+        # Revalidated with the previous response's ETag, a 304 reuses the cached list
+        stargazers = conditional_get(access_token, url, headers, params)
 
         # Filter by timestamp if provided
         filtered = []
@@ -67,14 +136,8 @@ def fetch_repo_issues(access_token, repo_name, since_timestamp=None, limit=10):
             'per_page': limit
         }
 
-        if since_timestamp:
-            since_dt = datetime.fromtimestamp(since_timestamp, tz=timezone.utc)
-            params['since'] = since_dt.isoformat()
-
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-
-        issues = response.json()
+        # Revalidated with the previous response's ETag, a 304 reuses the cached list
+        issues = conditional_get(access_token, url, headers, params)
 
         # Filter out pull requests (they show up in issues endpoint)
         filtered_issues = []
@@ -83,6 +146,10 @@ def fetch_repo_issues(access_token, repo_name, since_timestamp=None, limit=10):
                 created_at_str = issue.get('created_at')
                 created_at = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
 
+                # Filtered here rather than with the API's `since` so the URL (and its ETag) stays stable
+                if since_timestamp and created_at.timestamp() < since_timestamp:
+                    continue
+
                 filtered_issues.append({
                     'number': issue['number'],
                     'title': issue['title'],
@@ -119,10 +186,8 @@ def fetch_repo_pull_requests(access_token, repo_name, since_timestamp=None, limi
             'per_page': limit
         }
 
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-
-        prs = response.json()
+        # Revalidated with the previous response's ETag, a 304 reuses the cached list
+        prs = conditional_get(access_token, url, headers, params)
 
         # Format and filter PRs
         filtered_prs = []
@@ -169,7 +234,8 @@ def create_issue(access_token, repo_name, title, body):
             'body': body
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = http_client.post(url, headers=headers, json=data)
+        record_rate_limit(access_token, response)
         response.raise_for_status()
 
         result = response.json()
@@ -190,7 +256,8 @@ def create_issue(access_token, repo_name, title, body):
 
         return {
             'success': False,
-            'error': f'Failed to create GitHub issue: {error_msg}'
+            'error': f'Failed to create GitHub issue: {error_msg}',
+            'retryable': http_client.is_retryable(e)
         }
     except Exception as e:
         return {
@@ -1,23 +1,23 @@
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+from utils.google_client import get_google_service
 from datetime import datetime, timezone
 import base64
 
+# Headers needed by the action filters and trigger logs
+METADATA_HEADERS = ['From', 'Subject', 'Date']
+BATCH_URI = 'https://gmail.googleapis.com/batch/gmail/v1'
+# Gmail accepts up to 100 calls per batch but throttles batches above 50
+BATCH_SIZE = 50
+# Messages the incremental sync ignores
+SKIPPED_LABELS = {'DRAFT', 'SPAM', 'TRASH'}
 
-def create_gmail_service(access_token, refresh_token=None):
+
+def create_gmail_service(access_token, refresh_token=None, expiry=None):
     """Create Gmail API service with user's OAuth token"""
     try:
-        credentials = Credentials(
-            token=access_token,
-            refresh_token=refresh_token,
-            token_uri='https://oauth2.googleapis.com/token',
-            client_id=None,  # Not needed for API calls
-            client_secret=None
-        )
-
-        service = build('gmail', 'v1', credentials=credentials)
-        return service
+        # Reuses a cached service object (and its discovery document) for this token
+        return get_google_service('gmail', 'v1', access_token, refresh_token, expiry)
     except Exception as e:
         print(f"Error creating Gmail service: {str(e)}")
         return None
@@ -45,14 +45,8 @@ def fetch_new_emails(service, since_timestamp=None, max_results=10):
         if not messages:
             return []
 
-        # Fetch full message details
-        emails = []
-        for msg in messages:
-            email_data = get_email_details(service, msg['id'])
-            if email_data:
-                emails.append(email_data)
-
-        return emails
+        # Fetch headers of every message in batched requests
+        return fetch_email_metadata(service, [msg['id'] for msg in messages])
 
     except HttpError as error:
         print(f"Gmail API error: {error}")
@@ -62,41 +56,138 @@ def fetch_new_emails(service, since_timestamp=None, max_results=10):
         return []
 
 
-def get_email_details(service, message_id):
-    """Get detailed information about a specific email"""
+def get_history_id(service):
+    """Return the mailbox's current historyId (the starting point of incremental syncs)"""
+    profile = service.users().getProfile(userId='me', fields='historyId').execute()
+    return profile['historyId']
+
+
+def get_email_address(service):
+    """Return the address of the authenticated mailbox"""
+    profile = service.users().getProfile(userId='me', fields='emailAddress').execute()
+    return profile['emailAddress']
+
+
+def watch_mailbox(service, topic_name):
+    """Have Gmail publish inbox changes to a Pub/Sub topic (users.watch)
+
+    A watch lasts about 7 days and is renewed by calling this again. Returns
+    its expiration as an aware datetime.
+    """
+    response = service.users().watch(
+        userId='me',
+        body={'topicName': topic_name, 'labelIds': ['INBOX']}
+    ).execute()
+
+    return datetime.fromtimestamp(int(response['expiration']) / 1000, tz=timezone.utc)
+
+
+def fetch_added_message_ids(service, start_history_id, max_pages=5):
+    """List ids of the messages added to the mailbox since start_history_id
+
+    Returns (message_ids, history_id) with ids oldest first and history_id the
+    cursor to resume from, or None when start_history_id has expired and a
+    full sync is needed. Drafts, spam and trash are skipped.
+    """
+    message_ids = []
+    request = service.users().history().list(
+        userId='me',
+        startHistoryId=start_history_id,
+        historyTypes=['messageAdded']
+    )
+
+    for _ in range(max_pages):
+        try:
+            response = request.execute()
+        except HttpError as error:
+            if error.resp.status == 404:
+                return None  # History is only kept for about a week
+            raise
+
+        for record in response.get('history', []):
+            for added in record.get('messagesAdded', []):
+                message = added['message']
+                if SKIPPED_LABELS.intersection(message.get('labelIds', [])):
+                    continue
+                if message['id'] not in message_ids:
+                    message_ids.append(message['id'])
+
+        history_id = response.get('historyId', start_history_id)
+        request = service.users().history().list_next(request, response)
+        if request is None:
+            return message_ids, history_id
+
+    # Too many changes to catch up on, resync from scratch
+    return None
+
+
+def fetch_email_metadata(service, message_ids):
+    """Fetch sender, subject and date of several emails through the Gmail batch endpoint
+
+    Bodies are not downloaded: use get_email_body() when a reaction needs one.
+    Emails are returned in the order of message_ids, failed ones are skipped.
+    """
+    results = {}
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            print(f"Error getting email metadata: {str(exception)}")
+            return
+        results[request_id] = parse_email_metadata(response)
+
+    for start in range(0, len(message_ids), BATCH_SIZE):
+        batch = BatchHttpRequest(callback=on_response, batch_uri=BATCH_URI)
+        for message_id in message_ids[start:start + BATCH_SIZE]:
+            batch.add(
+                service.users().messages().get(
+                    userId='me',
+                    id=message_id,
+                    format='metadata',
+                    metadataHeaders=METADATA_HEADERS,
+                    fields='id,internalDate,snippet,payload/headers'
+                ),
+                request_id=message_id
+            )
+        batch.execute()
+
+    return [results[message_id] for message_id in message_ids if message_id in results]
+
+
+def parse_email_metadata(message):
+    """Build the email dict used by the scheduler from a metadata (or full) message"""
+    headers = message.get('payload', {}).get('headers', [])
+    subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
+    sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'Unknown')
+
+    # Parse timestamp
+    timestamp = message['internalDate']  # Milliseconds since epoch
+    timestamp_seconds = int(timestamp) / 1000
+    email_datetime = datetime.fromtimestamp(timestamp_seconds, tz=timezone.utc)
+
+    return {
+        'id': message['id'],
+        'sender': sender,
+        'subject': subject,
+        'timestamp': email_datetime,
+        'snippet': message.get('snippet', '')
+    }
+
+
+def get_email_body(service, message_id):
+    """Fetch the plain text body of an email (only when a reaction needs it)"""
     try:
         message = service.users().messages().get(
             userId='me',
             id=message_id,
-            format='full'
+            format='full',
+            fields='payload'
         ).execute()
 
-        # Extract headers
-        headers = message['payload']['headers']
-        subject = next((h['value'] for h in headers if h['name'].lower() == 'subject'), 'No Subject')
-        sender = next((h['value'] for h in headers if h['name'].lower() == 'from'), 'Unknown')
-        date_str = next((h['value'] for h in headers if h['name'].lower() == 'date'), None)
-
-        # Extract body
-        body = extract_message_body(message['payload'])
-
-        # Parse timestamp
-        timestamp = message['internalDate']  # Milliseconds since epoch
-        timestamp_seconds = int(timestamp) / 1000
-        email_datetime = datetime.fromtimestamp(timestamp_seconds, tz=timezone.utc)
-
-        return {
-            'id': message_id,
-            'sender': sender,
-            'subject': subject,
-            'body': body,
-            'timestamp': email_datetime,
-            'snippet': message.get('snippet', '')
-        }
+        return extract_message_body(message['payload'])
 
     except Exception as e:
-        print(f"Error getting email details: {str(e)}")
-        return None
+        print(f"Error getting email body: {str(e)}")
+        return ""
 
 
 def extract_message_body(payload):
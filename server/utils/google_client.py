@@ -0,0 +1,98 @@
+import json
+import threading
+from collections import OrderedDict
+from datetime import timezone
+import httplib2
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient import discovery_cache
+from googleapiclient.discovery import build, build_from_document
+from config import Config
+
+# Parsed discovery documents, shared by the whole process
+_discovery_documents = {}
+# Built API service objects keyed by (api, version, access_token, refresh_token), least recently used first
+_services = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class _ThreadLocalHttp:
+    """httplib2.Http is not thread-safe: give every thread its own connection behind a shared service"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def _http(self):
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._local.http = httplib2.Http(timeout=Config.HTTP_READ_TIMEOUT_SECONDS)
+        return http
+
+    def request(self, *args, **kwargs):
+        return self._http.request(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._http, name)
+
+
+def get_discovery_document(api, version):
+    """Return the parsed discovery document of an API (parsed once per process)"""
+    key = (api, version)
+    with _cache_lock:
+        document = _discovery_documents.get(key)
+    if document is not None:
+        return document
+
+    # Discovery documents ship with google-api-python-client
+    content = discovery_cache.get_static_doc(api, version)
+    if content is None:
+        return None
+
+    document = json.loads(content)
+    with _cache_lock:
+        _discovery_documents[key] = document
+    return document
+
+
+def get_google_service(api, version, access_token, refresh_token=None, expiry=None):
+    """Return a (cached) Google API service object for the user's OAuth token
+
+    Services are reused while the token is unchanged: a refreshed token is a
+    new cache key, and entries whose credentials expired are rebuilt. The
+    least recently used entries are evicted past GOOGLE_SERVICE_CACHE_SIZE.
+    """
+    key = (api, version, access_token, refresh_token)
+
+    with _cache_lock:
+        cached = _services.get(key)
+        if cached is not None:
+            service, credentials = cached
+            if not credentials.expired:
+                _services.move_to_end(key)
+                return service
+            del _services[key]
+
+    credentials = Credentials(
+        token=access_token,
+        refresh_token=refresh_token,
+        token_uri='https://oauth2.googleapis.com/token',
+        client_id=None,  # Not needed for API calls
+        client_secret=None,
+        expiry=expiry.astimezone(timezone.utc).replace(tzinfo=None) if expiry and expiry.tzinfo else expiry
+    )
+
+    document = get_discovery_document(api, version)
+    if document is not None:
+        http = AuthorizedHttp(credentials, http=_ThreadLocalHttp())
+        service = build_from_document(document, http=http)
+    else:
+        service = build(api, version, credentials=credentials, cache_discovery=False)
+
+    with _cache_lock:
+        _services[key] = (service, credentials)
+        _services.move_to_end(key)
+        while len(_services) > Config.GOOGLE_SERVICE_CACHE_SIZE:
+            _services.popitem(last=False)
+
+    return service
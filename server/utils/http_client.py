@@ -0,0 +1,86 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import Config
+
+# One pooled keep-alive session per provider host (api.github.com, api.spotify.com, graph.facebook.com, ...)
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# Statuses worth another try later: rate limited or a provider-side failure
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class _CappedRetry(Retry):
+    """Retry that never sleeps longer than HTTP_MAX_RETRY_AFTER_SECONDS on a Retry-After header"""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, Config.HTTP_MAX_RETRY_AFTER_SECONDS)
+
+
+def _build_session() -> requests.Session:
+    """Create a session with a connection pool and retry/backoff on 429 and 5xx"""
+    retry = _CappedRetry(
+        total=Config.HTTP_MAX_RETRIES,
+        backoff_factor=Config.HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRYABLE_STATUSES,
+        allowed_methods=frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'}),  # POST is not idempotent
+        respect_retry_after_header=True,
+        raise_on_status=False  # Hand the last response back so callers' raise_for_status() still applies
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.HTTP_POOL_SIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session(url) -> requests.Session:
+    """Return the shared session for the URL's host"""
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _build_session()
+        return session
+
+
+def request(method, url, **kwargs) -> requests.Response:
+    """Send a request through the host's pooled session, with the default timeouts"""
+    kwargs.setdefault('timeout', (Config.HTTP_CONNECT_TIMEOUT_SECONDS, Config.HTTP_READ_TIMEOUT_SECONDS))
+    return get_session(url).request(method, url, **kwargs)
+
+
+def get(url, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs) -> requests.Response:
+    return request('POST', url, **kwargs)
+
+
+def put(url, **kwargs) -> requests.Response:
+    return request('PUT', url, **kwargs)
+
+
+def is_retryable(error) -> bool:
+    """Whether a failed provider call is transient (timeout, connection drop, 429, 5xx) and worth retrying"""
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError, TimeoutError, ConnectionError)):
+        return True
+
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        # googleapiclient's HttpError carries an httplib2 response on .resp
+        status = getattr(getattr(error, 'resp', None), 'status', None)
+
+    try:
+        return int(status) in RETRYABLE_STATUSES
+    except (TypeError, ValueError):
+        return False
@@ -0,0 +1,80 @@
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import DateTime, tuple_
+from config import Config
+
+
+def get_per_page(default) -> int:
+    """?per_page= clamped to [1, API_MAX_PER_PAGE]"""
+    per_page = request.args.get('per_page', default, type=int)
+    return max(1, min(per_page, Config.API_MAX_PER_PAGE))
+
+
+def include_total(default) -> bool:
+    """?include_total=true|false, the COUNT(*) is skipped when false"""
+    value = request.args.get('include_total')
+    if value is None:
+        return default
+    return value.lower() == 'true'
+
+
+def encode_cursor(values) -> str:
+    """Opaque token holding the sort key of the last item of a page"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, columns) -> list:
+    """Read back a token made by encode_cursor, raising ValueError when it is not one"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) else int(value)
+            for column, value in zip(columns, payload)
+        ]
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor') from None
+
+
+def paginate(query, columns, default_per_page) -> dict:
+    """Paginate a query newest first, by page number or by cursor
+
+    `columns` is the sort key (DateTime and integer columns), ending with a
+    unique column (id) as tie-breaker. With ?cursor= (empty for the first
+    page) the page is read with a keyset condition on the key of the previous
+    page's last item instead of an OFFSET, so deep pages cost the same as the
+    first one; the total is only counted with ?include_total=true. Without
+    it, the ?page= mode is kept (counted unless ?include_total=false).
+    Returns the page's 'items' and its metadata; raises ValueError on an
+    invalid cursor.
+    """
+    per_page = get_per_page(default_per_page)
+    order = [column.desc() for column in columns]
+    cursor = request.args.get('cursor')
+
+    if cursor is None:
+        page = request.args.get('page', 1, type=int)
+        counted = include_total(True)
+        pagination = query.order_by(*order).paginate(page=page, per_page=per_page, error_out=False, count=counted)
+        result = {'items': pagination.items, 'page': pagination.page, 'per_page': pagination.per_page}
+        if counted:
+            result['total'] = pagination.total
+            result['total_pages'] = pagination.pages
+        return result
+
+    result = {'per_page': per_page}
+    if include_total(False):
+        result['total'] = query.order_by(None).count()
+
+    if cursor:
+        query = query.filter(tuple_(*columns) < tuple_(*decode_cursor(cursor, columns)))
+    items = query.order_by(*order).limit(per_page + 1).all()
+
+    has_more = len(items) > per_page
+    result['items'] = items[:per_page]
+    result['next_cursor'] = encode_cursor([getattr(items[per_page - 1], column.key) for column in columns]) if has_more else None
+    return result
@@ -0,0 +1,110 @@
+import hashlib
+import random
+import threading
+from datetime import datetime, timezone, timedelta
+from config import Config
+
+# Last known rate limit budget by (provider, token hash), shared by every area polling with the token
+_budgets = {}
+_budgets_lock = threading.Lock()
+
+
+def token_key(access_token):
+    """Identify a token in in-memory caches without keeping the token itself"""
+    return hashlib.sha256(access_token.encode('utf-8')).hexdigest()
+
+
+def record_budget(provider, access_token, limit, remaining, reset_at):
+    """Store the budget a provider reported for a token (reset_at is an aware datetime)"""
+    now = datetime.now(timezone.utc)
+
+    with _budgets_lock:
+        _budgets[(provider, token_key(access_token))] = {
+            'limit': limit,
+            'remaining': remaining,
+            'reset_at': reset_at,
+            'updated_at': now
+        }
+
+        # Forget tokens not seen for a while (disconnected, rotated)
+        stale_before = now - timedelta(hours=1)
+        for key in [key for key, budget in _budgets.items() if budget['reset_at'] < stale_before]:
+            del _budgets[key]
+
+
+def poll_delay(provider, access_token, now=None) -> float:
+    """Return how many seconds polls using the token should wait, 0 when the budget is healthy
+
+    Below GITHUB_RATE_LIMIT_LOW_RATIO of the limit, polls are pushed further
+    towards the reset time as the budget shrinks; at GITHUB_RATE_LIMIT_RESERVE
+    remaining calls (kept for reactions) they wait for the reset. Delays are
+    jittered so the token's polls resume spread out rather than all at once.
+    """
+    with _budgets_lock:
+        budget = _budgets.get((provider, token_key(access_token)))
+
+    if not budget:
+        return 0
+
+    now = now or datetime.now(timezone.utc)
+    seconds_to_reset = (budget['reset_at'] - now).total_seconds()
+    if seconds_to_reset <= 0:
+        return 0  # The window was reset, the full budget is available again
+
+    low = budget['limit'] * Config.GITHUB_RATE_LIMIT_LOW_RATIO
+    reserve = Config.GITHUB_RATE_LIMIT_RESERVE
+    if budget['remaining'] >= low:
+        return 0
+
+    if budget['remaining'] <= reserve:
+        delay = seconds_to_reset
+    else:
+        delay = seconds_to_reset * (1 - (budget['remaining'] - reserve) / max(low - reserve, 1))
+
+    return delay * random.uniform(1.0, 1.1)
+
+
+def budget_snapshot(provider) -> list:
+    """Current budgets of a provider's tokens, JSON-serializable (published on the scheduler node's row)"""
+    now = datetime.now(timezone.utc)
+    with _budgets_lock:
+        budgets = [(key, budget) for (name, key), budget in _budgets.items() if name == provider and budget['reset_at'] > now]
+
+    return [
+        {
+            'token': key[:16],
+            'limit': budget['limit'],
+            'remaining': budget['remaining'],
+            'reset_at': budget['reset_at'].isoformat(),
+            'updated_at': budget['updated_at'].isoformat()
+        }
+        for key, budget in budgets
+    ]
+
+
+def budget_summary(snapshots) -> dict:
+    """Aggregate budget state of a provider's tokens (for /health)
+
+    snapshots are the budget_snapshot() lists of every scheduler node; a
+    token seen by several nodes counts once, with its latest budget.
+    """
+    now = datetime.now(timezone.utc)
+    latest = {}
+    for snapshot in snapshots:
+        for budget in snapshot:
+            known = latest.get(budget['token'])
+            if known is None or budget['updated_at'] > known['updated_at']:
+                latest[budget['token']] = budget
+    budgets = [budget for budget in latest.values() if datetime.fromisoformat(budget['reset_at']) > now]
+
+    if not budgets:
+        return {'tokens': 0}
+
+    lowest = min(budgets, key=lambda budget: budget['remaining'])
+    return {
+        'tokens': len(budgets),
+        'low': sum(1 for budget in budgets if budget['remaining'] < budget['limit'] * Config.GITHUB_RATE_LIMIT_LOW_RATIO),
+        'exhausted': sum(1 for budget in budgets if budget['remaining'] <= Config.GITHUB_RATE_LIMIT_RESERVE),
+        'min_remaining': lowest['remaining'],
+        'min_remaining_reset_at': lowest['reset_at']
+    }
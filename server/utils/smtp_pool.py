@@ -0,0 +1,137 @@
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from config import Config
+
+# Authenticated connections waiting to be reused, most recently used last
+_idle = []
+_idle_lock = threading.Lock()
+_slots = None  # Caps open connections at SMTP_POOL_SIZE, created on first use
+_slots_lock = threading.Lock()
+
+# Errors meaning the server dropped a connection, worth one retry on a fresh one
+_DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class _Connection:
+    def __init__(self):
+        self.smtp = smtplib.SMTP(Config.SMTP_HOST, Config.SMTP_PORT, timeout=Config.SMTP_TIMEOUT_SECONDS)
+        try:
+            if Config.SMTP_USE_TLS:
+                self.smtp.starttls()
+            if Config.SMTP_USERNAME and Config.SMTP_PASSWORD:
+                self.smtp.login(Config.SMTP_USERNAME, Config.SMTP_PASSWORD)
+        except Exception:
+            self.close()
+            raise
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def is_reusable(self) -> bool:
+        """Servers drop idle sessions and cap messages per session: retire connections before they do"""
+        return (
+            time.monotonic() - self.last_used < Config.SMTP_IDLE_TIMEOUT_SECONDS
+            and self.sent < Config.SMTP_MAX_MESSAGES_PER_CONNECTION
+        )
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+
+def _get_slots():
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(Config.SMTP_POOL_SIZE)
+        return _slots
+
+
+@contextmanager
+def _checkout(fresh=False):
+    """Borrow a connection: a reusable idle one, or a newly opened and authenticated one"""
+    slots = _get_slots()
+    slots.acquire()
+    try:
+        connection = None
+        stale = []
+        if not fresh:
+            with _idle_lock:
+                while _idle and connection is None:
+                    candidate = _idle.pop()
+                    if candidate.is_reusable():
+                        connection = candidate
+                    else:
+                        stale.append(candidate)
+        for candidate in stale:
+            candidate.close()
+
+        reused = connection is not None
+        if connection is None:
+            connection = _Connection()
+
+        try:
+            yield connection, reused
+        except Exception:
+            connection.close()
+            raise
+
+        connection.last_used = time.monotonic()
+        if connection.is_reusable():
+            with _idle_lock:
+                _idle.append(connection)
+        else:
+            connection.close()
+    finally:
+        slots.release()
+
+
+def send_message(message):
+    """Send an email.message.Message over a pooled connection
+
+    A reused connection the server already closed is replaced once by a
+    fresh one. SMTP errors are raised to the caller like smtplib does.
+    """
+    send_messages([message])
+
+
+def send_messages(messages, on_sent=None):
+    """Send several messages back to back over one pooled connection
+
+    on_sent(message) is called after each message is accepted, so a caller
+    can tell which ones went out when a later one raises.
+    """
+    remaining = list(messages)
+    retried = False
+
+    while remaining:
+        reused = False
+        try:
+            with _checkout(fresh=retried) as (connection, reused):
+                while remaining:
+                    connection.smtp.send_message(remaining[0])
+                    connection.sent += 1
+                    message = remaining.pop(0)
+                    if on_sent:
+                        on_sent(message)
+                    if not connection.is_reusable():
+                        break  # Per-connection message cap reached, continue on another one
+        except _DISCONNECT_ERRORS:
+            if retried or not reused:
+                raise
+            retried = True
+
+
+def close_all():
+    """Close idle pooled connections (e.g. on shutdown)"""
+    with _idle_lock:
+        connections = list(_idle)
+        _idle.clear()
+    for connection in connections:
+        connection.close()
@@ -1,4 +1,5 @@
 import requests
+from utils import http_client
 from datetime import datetime, timezone
 
 
@@ -15,7 +16,7 @@ def get_user_playlists(access_token, limit=20):
             'limit': limit
         }
 
-        response = requests.get(url, headers=headers, params=params)
+        response = http_client.get(url, headers=headers, params=params)
         response.raise_for_status()
 
         data = response.json()
@@ -51,7 +52,7 @@ def get_playlist_tracks(access_token, playlist_id, since_timestamp=None, limit=2
             'limit': limit
         }
 
-        response = requests.get(url, headers=headers, params=params)
+        response = http_client.get(url, headers=headers, params=params)
         response.raise_for_status()
 
         data = response.json()
@@ -99,7 +100,7 @@ def get_user_saved_tracks(access_token, since_timestamp=None, limit=20):
             'limit': limit
         }
 
-        response = requests.get(url, headers=headers, params=params)
+        response = http_client.get(url, headers=headers, params=params)
         response.raise_for_status()
 
         data = response.json()
@@ -143,7 +144,7 @@ def get_current_playback(access_token):
             'Authorization': f'Bearer {access_token}'
         }
 
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers)
 
         # 204 means no content (nothing playing)
         if response.status_code == 204:
@@ -187,7 +188,7 @@ def add_track_to_playlist(access_token, playlist_id, track_uri):
             'uris': [track_uri if track_uri.startswith('spotify:') else f'spotify:track:{track_uri}']
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = http_client.post(url, headers=headers, json=data)
         response.raise_for_status()
 
         return {
@@ -205,7 +206,8 @@ def add_track_to_playlist(access_token, playlist_id, track_uri):
 
         return {
             'success': False,
-            'error': f'Failed to add track to playlist: {error_msg}'
+            'error': f'Failed to add track to playlist: {error_msg}',
+            'retryable': http_client.is_retryable(e)
         }
     except Exception as e:
         return {
@@ -230,7 +232,7 @@ def create_playlist(access_token, user_id, name, description='', public=True):
             'public': public
         }
 
-        response = requests.post(url, headers=headers, json=data)
+        response = http_client.post(url, headers=headers, json=data)
         response.raise_for_status()
 
         result = response.json()
@@ -252,7 +254,8 @@ def create_playlist(access_token, user_id, name, description='', public=True):
 
         return {
             'success': False,
-            'error': f'Failed to create playlist: {error_msg}'
+            'error': f'Failed to create playlist: {error_msg}',
+            'retryable': http_client.is_retryable(e)
         }
     except Exception as e:
         return {
@@ -277,7 +280,7 @@ def start_playback(access_token, track_uri=None, context_uri=None):
         elif context_uri:
             data['context_uri'] = context_uri
 
-        response = requests.put(url, headers=headers, json=data)
+        response = http_client.put(url, headers=headers, json=data)
         response.raise_for_status()
 
         return {
@@ -295,7 +298,8 @@ def start_playback(access_token, track_uri=None, context_uri=None):
 
         return {
             'success': False,
-            'error': f'Failed to start playback: {error_msg}'
+            'error': f'Failed to start playback: {error_msg}',
+            'retryable': http_client.is_retryable(e)
         }
     except Exception as e:
         return {
@@ -313,7 +317,7 @@ def pause_playback(access_token):
             'Authorization': f'Bearer {access_token}'
         }
 
-        response = requests.put(url, headers=headers)
+        response = http_client.put(url, headers=headers)
         response.raise_for_status()
 
         return {
@@ -354,7 +358,7 @@ def save_track(access_token, track_id):
             'ids': [track_id.replace('spotify:track:', '')]
         }
 
-        response = requests.put(url, headers=headers, json=data)
+        response = http_client.put(url, headers=headers, json=data)
         response.raise_for_status()
 
         return {
@@ -390,7 +394,7 @@ def get_user_profile(access_token):
             'Authorization': f'Bearer {access_token}'
         }
 
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers)
         response.raise_for_status()
 
         data = response.json()